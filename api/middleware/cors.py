@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Static CORS Middleware
+Wildcard CORS headers appended as prebuilt bytes, with no per-request parsing
+"""
+
+from typing import Iterable
+
+_ORIGIN_HEADER = (b'access-control-allow-origin', b'*')
+_PREFLIGHT_METHOD = b'access-control-request-method'
+_PREFLIGHT_HEADERS = b'access-control-request-headers'
+
+class StaticCORSMiddleware:
+    """Allow-all CORS for ASGI apps
+
+    Starlette's CORSMiddleware parses request headers on every call so it can
+    match origins. When every origin is allowed the answer never changes: this
+    appends one fixed header to responses and answers preflights with a
+    prebuilt 204 without reaching the app. The requested headers are echoed
+    back rather than answered with '*', which never covers Authorization.
+    """
+
+    def __init__(self, app, allow_methods: Iterable[str] = ('DELETE', 'GET', 'HEAD', 'OPTIONS', 'PATCH', 'POST', 'PUT'),
+                 max_age: int = 600):
+        self.app = app
+        self._preflight_headers = [
+            _ORIGIN_HEADER,
+            (b'access-control-allow-methods', ', '.join(allow_methods).encode()),
+            (b'access-control-max-age', str(max_age).encode()),
+            (b'content-length', b'0'),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # Only OPTIONS requests need their headers looked at
+        if scope['method'] == 'OPTIONS':
+            request_headers = dict(scope['headers'])
+            if _PREFLIGHT_METHOD in request_headers:
+                await self._preflight(request_headers.get(_PREFLIGHT_HEADERS), send)
+                return
+
+        async def send_with_cors(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*message.get('headers', ()), _ORIGIN_HEADER]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def _preflight(self, requested_headers, send):
+        headers = self._preflight_headers
+        if requested_headers:
+            headers = [*headers, (b'access-control-allow-headers', requested_headers)]
+        await send({'type': 'http.response.start', 'status': 204, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''})
@@ -4,6 +4,8 @@ Security Middleware
 API key authentication and local-only binding
 """
 
+import hmac
+import ipaddress
 import os
 from fastapi import HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -11,24 +13,35 @@ from typing import Optional
 
 security = HTTPBearer(auto_error=False)
 
+# Localhost and loopback names accepted without parsing
+_LOOPBACK_NAMES = frozenset(('127.0.0.1', 'localhost', '::1'))
+
+# Resolved once at startup so the per-request checks are a global load
+_API_KEY_ENABLED = bool(os.getenv('API_KEY'))
+_BIND_LOCAL = os.getenv('API_BIND_LOCAL', 'false').lower() == 'true'
+_BEARER = 'Bearer'
+
 class SecurityMiddleware:
     def __init__(self):
-        self.api_key_enabled = bool(os.getenv('API_KEY'))
+        self.api_key_enabled = _API_KEY_ENABLED
         self.required_api_key = os.getenv('API_KEY', '')
-        self.bind_local = os.getenv('API_BIND_LOCAL', 'false').lower() == 'true'
+        self._required_api_key_b = self.required_api_key.encode()  # Encoded once for compare_digest
+        self.bind_local = _BIND_LOCAL
     
     async def validate_api_key(self, request: Request) -> bool:
         """Validate API key if enabled"""
         if not self.api_key_enabled:
             return True  # No API key required
         
+        headers = request.headers
+        
         # Check X-API-Key header
-        api_key = request.headers.get('X-API-Key')
+        api_key = headers.get('X-API-Key')
         if not api_key:
             # Check Authorization header as fallback
-            auth_header = request.headers.get('Authorization', '')
-            if auth_header.startswith('Bearer '):
-                api_key = auth_header[7:]  # Remove 'Bearer ' prefix
+            scheme, sep, token = headers.get('Authorization', '').partition(' ')
+            if sep and scheme == _BEARER:
+                api_key = token
         
         if not api_key:
             raise HTTPException(
@@ -37,7 +50,8 @@ class SecurityMiddleware:
                 headers={"WWW-Authenticate": "Bearer"}
             )
         
-        if api_key != self.required_api_key:
+        # Constant-time comparison so response timing doesn't leak key prefixes
+        if not hmac.compare_digest(api_key.encode(), self._required_api_key_b):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid API key",
@@ -54,23 +68,31 @@ class SecurityMiddleware:
         client_host = request.client.host if request.client else None
         
         # Allow localhost and loopback
-        allowed_hosts = ['127.0.0.1', 'localhost', '::1']
+        if client_host in _LOOPBACK_NAMES:
+            return True
         
-        if client_host not in allowed_hosts:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Access restricted to localhost only. Client IP: {client_host}"
-            )
+        # Any other loopback address (127.0.0.0/8, IPv4-mapped ::ffff:127.0.0.1)
+        try:
+            ip = ipaddress.ip_address(client_host)
+            if ip.is_loopback or (ip.version == 6 and ip.ipv4_mapped and ip.ipv4_mapped.is_loopback):
+                return True
+        except (TypeError, ValueError):
+            pass
         
-        return True
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Access restricted to localhost only. Client IP: {client_host}"
+        )
 
 # Global security instance
 security_middleware = SecurityMiddleware()
 
 async def security_dependency(request: Request):
     """FastAPI dependency for security checks"""
-    await security_middleware.validate_local_access(request)
-    await security_middleware.validate_api_key(request)
+    if _BIND_LOCAL:
+        await security_middleware.validate_local_access(request)
+    if _API_KEY_ENABLED:
+        await security_middleware.validate_api_key(request)
     return True
 
 def get_security_status() -> dict:
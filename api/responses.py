@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+API Responses
+Default JSON response class backed by orjson when it is installed
+"""
+
+import json
+import math
+from typing import Any
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator; falls back to JSONResponse's stdlib encoder
+    orjson = None
+
+def _default(value: Any) -> str:
+    """Fallback for values JSON has no type for (datetimes, Neo4j temporals, ...)"""
+    isoformat = getattr(value, 'isoformat', None)
+    return isoformat() if isoformat else str(value)
+
+def _finite(value: Any) -> Any:
+    """Copy of value with NaN/Infinity floats replaced by None, as orjson encodes them"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+def _stdlib_dumps(content: Any) -> bytes:
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact UTF-8 JSON (orjson when available)
+    
+    Non-finite floats are written as null on both paths.
+    """
+    if orjson is None:
+        try:
+            return _stdlib_dumps(content)
+        except ValueError:
+            # Only rewrite the payload when it actually holds NaN/Infinity
+            return _stdlib_dumps(_finite(content))
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that serializes with orjson's C encoder when available
+    
+    Used as default_response_class by the app and the data-heavy routers
+    (RAG results, graph paths, ingestion status). Handlers may also return it
+    directly with a plain payload to skip FastAPI's jsonable_encoder walk;
+    values JSON can't represent natively (e.g. Neo4j temporal types) are
+    rendered as ISO strings, or with str().
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+class EncodedJSONResponse(Response):
+    """JSON response over a body already encoded with dumps()
+    
+    For cached payloads: cache the bytes, not a response. Middleware such as
+    GZip edits a response's header list in place, so each request needs its
+    own Response object.
+    """
+    
+    media_type = "application/json"
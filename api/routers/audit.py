@@ -7,18 +7,113 @@ Real-time audit streaming and cryptographic attestation
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Any, AsyncGenerator
+from typing import Dict, List, Optional, Any, AsyncGenerator, Tuple
 import asyncio
 import hashlib
 import json
+import math
+import os
+import sys
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from itertools import islice
 from datetime import datetime
 import uuid
 
+try:
+    import orjson
+except ImportError:  # Optional accelerator; _canonical_json's fallback hashes the same bytes
+    orjson = None
+
 router = APIRouter(prefix="/audit", tags=["audit"])
 
-# In-memory audit log (production would use persistent storage)
-audit_events = []
-audit_subscribers = set()
+# In-memory audit log (production would use persistent storage); bounded so hot
+# reads stay O(limit) and memory stays flat. Evicted events can spill to disk.
+AUDIT_MAX_EVENTS = int(os.getenv('AUDIT_MAX_EVENTS', '100000'))
+AUDIT_SPILL_PATH = os.getenv('AUDIT_SPILL_PATH')  # Append-only JSONL for evicted events
+AUDIT_SPILL_FSYNC_EVERY = 256
+
+# Bound once at import so the per-event hashes skip the algorithm lookup that
+# hashlib.new() repeats on every call; OpenSSL dispatches to SHA-NI underneath.
+_sha256 = hashlib.sha256
+
+def _json_key(key: Any) -> str:
+    """Object key as orjson's OPT_NON_STR_KEYS writes it"""
+    if isinstance(key, str):
+        return key
+    if key is None or isinstance(key, (bool, int, float)):
+        return json.dumps(key)  # 'null', 'true', '1', '1.5'
+    isoformat = getattr(key, 'isoformat', None)
+    return isoformat() if isoformat else str(key)
+
+def _as_orjson_sees_it(value: Any) -> Any:
+    """Copy of value with keys stringified and NaN/Infinity as None, as orjson encodes them"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {_json_key(key): _as_orjson_sees_it(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_as_orjson_sees_it(item) for item in value]
+    return value
+
+def _canonical_json(payload: Dict) -> bytes:
+    """Sorted-key, compact JSON bytes used as the payload hash input
+    
+    The stdlib fallback stringifies keys before sorting them and writes
+    non-finite floats as null, so hashes don't depend on orjson being installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        _as_orjson_sees_it(payload), sort_keys=True, separators=(',', ':'), ensure_ascii=False, allow_nan=False
+    ).encode()
+
+def _json_bytes(data: Dict) -> bytes:
+    """Compact JSON bytes for the SSE stream"""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode()
+
+# Operation and entity labels come from a small, repeating set; keep their
+# encoded form so the attestation input is one join over ready-made bytes.
+_ENCODED_LABELS: Dict[str, bytes] = {}
+_ENCODED_LABELS_MAX = 1024
+
+def _label_bytes(label: str) -> bytes:
+    """Pre-encoded bytes for an operation/entity label"""
+    encoded = _ENCODED_LABELS.get(label)
+    if encoded is None:
+        encoded = label.encode()
+        if len(_ENCODED_LABELS) < _ENCODED_LABELS_MAX:
+            _ENCODED_LABELS[label] = encoded
+    return encoded
+
+# Classifications and operations come from small fixed sets; interning them
+# lets every retained event share one string object per label, and set
+# membership hits the identity fast path.
+_intern = sys.intern
+_CHAIN_OF_CUSTODY = frozenset(map(_intern, ('evidence', 'privileged')))
+
+def _hash_event(operation: str, entity: str, payload_bytes: bytes, timestamp: str) -> Tuple[str, str]:
+    """Payload hash and local Merkle attestation hash for one event"""
+    # Hash payload for integrity
+    payload_hash = _sha256(payload_bytes).hexdigest()
+    
+    # Create attestation hash (local Merkle)
+    attestation_data = b":".join((
+        _label_bytes(operation), _label_bytes(entity), payload_hash.encode(), timestamp.encode()
+    ))
+    return payload_hash, _sha256(attestation_data).hexdigest()
+
+# hashlib releases the GIL for buffers over ~2KB, so only payloads at least
+# this large are worth the executor hand-off in acreate_audit_event().
+_EXECUTOR_HASH_MIN_BYTES = 2048
+
+# Prebuilt SSE framing
+_SSE_DATA = b"data: "
+_SSE_END = b"\n\n"
+_KEEPALIVE_PREFIX = b'data: {"keepalive":true,"timestamp":"'
+_KEEPALIVE_SUFFIX = b'"}\n\n'
 
 class AuditEvent(BaseModel):
     id: str
@@ -31,6 +126,14 @@ class AuditEvent(BaseModel):
     chain_of_custody: Optional[bool] = False
     attestation_hash: Optional[str] = None
 
+@dataclass(slots=True)
+class MerkleNode:
+    """Local Merkle log entry; hashes are raw 32-byte SHA-256 digests"""
+    hash: bytes
+    previous: bytes
+    timestamp: str
+    operation: str
+
 class AttestationRequest(BaseModel):
     memory_id: str
     attestation_type: str = 'merkle_local'
@@ -38,81 +141,276 @@ class AttestationRequest(BaseModel):
 
 class AuditTrail:
     def __init__(self):
-        self.merkle_log = []  # Local Merkle log
+        self.merkle_log: List[MerkleNode] = []  # Local Merkle log
+        self._peaks = []  # Roots of the perfect subtrees covering the log (Merkle frontier)
+        self._cached_root = b''
+        self._last_hash = b''  # Genesis link
+        self._broken_at = None  # First index whose link failed the append-time check
+        self._dirty_from = None  # First index not yet covered by verify_full()
+        # Retained events; the indexes below cover exactly these, so each trail owns its own
+        self._events = deque(maxlen=AUDIT_MAX_EVENTS)
+        self._entity_index = defaultdict(deque)  # entity -> retained events in append order
+        self._memory_index = defaultdict(deque)  # memory_id / payload_hash -> retained events
+        self._event_memory_ids = {}  # event id -> memory_id, to unindex on eviction
+        self._spill_file = None
+        self._spill_pending = 0
+        self._cls_counts = Counter()  # classification -> event count
+        
+        # Real-time fan-out: streams tail a shared ring instead of owning a queue each
+        self._ring = deque(maxlen=1024)
+        self._published = 0  # Total events ever pushed to the ring (stream cursor)
+        self._wake = asyncio.Event()
+        self.active_streams = 0
     
     def create_audit_event(self, operation: str, entity: str, classification: str, 
                           payload: Dict, user: str = 'system') -> AuditEvent:
         """Create cryptographically hashed audit event"""
-        # Hash payload for integrity
-        payload_str = json.dumps(payload, sort_keys=True)
-        payload_hash = hashlib.sha256(payload_str.encode()).hexdigest()
+        event = self._build_event(operation, entity, classification, payload, user,
+                                  datetime.utcnow().isoformat())
+        self._record_event(event, payload.get('memory_id'))
+        return event
+    
+    def create_audit_events(self, records: List[Dict]) -> List[AuditEvent]:
+        """Create a burst of audit events in one pass
+        
+        Every payload in the batch is hashed before any event is published,
+        so readers and subscribers never see a partially hashed batch. Records
+        may carry their own timestamp (e.g. when queued earlier); the rest
+        share one batch timestamp.
+        """
+        timestamp = datetime.utcnow().isoformat()
+        events = [self._build_event(**{'timestamp': timestamp, **record}) for record in records]
+        for event, record in zip(events, records):
+            self._record_event(event, record['payload'].get('memory_id'))
+        return events
+    
+    async def acreate_audit_event(self, operation: str, entity: str, classification: str,
+                                  payload: Dict, user: str = 'system') -> AuditEvent:
+        """create_audit_event for async callers; large payloads hash on a worker thread
         
-        # Create attestation hash (local Merkle)
-        attestation_data = f"{operation}:{entity}:{payload_hash}:{datetime.utcnow().isoformat()}"
-        attestation_hash = hashlib.sha256(attestation_data.encode()).hexdigest()
+        The event is still recorded on the loop thread, so the Merkle log,
+        indexes and stream wake-up are never touched concurrently.
+        """
+        timestamp = datetime.utcnow().isoformat()
+        payload_bytes = _canonical_json(payload)
+        if len(payload_bytes) >= _EXECUTOR_HASH_MIN_BYTES:
+            hashes = await asyncio.get_running_loop().run_in_executor(
+                None, _hash_event, operation, entity, payload_bytes, timestamp
+            )
+        else:
+            hashes = _hash_event(operation, entity, payload_bytes, timestamp)
         
-        event = AuditEvent(
+        event = self._make_event(operation, entity, classification, user, timestamp, *hashes)
+        self._record_event(event, payload.get('memory_id'))
+        return event
+    
+    def _build_event(self, operation: str, entity: str, classification: str,
+                     payload: Dict, user: str = 'system', timestamp: str = None) -> AuditEvent:
+        """Hash payload and attestation for a not-yet-published event"""
+        hashes = _hash_event(operation, entity, _canonical_json(payload), timestamp)
+        return self._make_event(operation, entity, classification, user, timestamp, *hashes)
+    
+    @staticmethod
+    def _make_event(operation: str, entity: str, classification: str, user: str,
+                    timestamp: str, payload_hash: str, attestation_hash: str) -> AuditEvent:
+        classification = _intern(classification)
+        
+        # Every field is server-generated, so skip validation on the hot path;
+        # the model is only a serialization shape at the API boundary.
+        return AuditEvent.model_construct(
             id=str(uuid.uuid4()),
-            timestamp=datetime.utcnow().isoformat(),
-            operation=operation,
+            timestamp=timestamp,
+            operation=_intern(operation),
             entity=entity,
             classification=classification,
             user=user,
             payload_hash=payload_hash,
-            chain_of_custody=classification in ['evidence', 'privileged'],
+            chain_of_custody=classification in _CHAIN_OF_CUSTODY,
             attestation_hash=attestation_hash
         )
-        
+    
+    def _record_event(self, event: AuditEvent, memory_id: str = None):
+        """Append event to the Merkle log, indexes, and subscriber queues"""
         # Add to Merkle log
-        self.merkle_log.append({
-            'hash': attestation_hash,
-            'previous': self.merkle_log[-1]['hash'] if self.merkle_log else '0',
-            'timestamp': event.timestamp,
-            'operation': operation
-        })
+        self._append_merkle(event.attestation_hash, event.timestamp, event.operation)
         
-        # Store event
-        audit_events.append(event)
+        # Store event (the deque drops the oldest once full)
+        if len(self._events) == self._events.maxlen:
+            self._evict(self._events[0])
+        self._events.append(event)
+        self._entity_index[event.entity].append(event)
+        self._cls_counts[event.classification] += 1
+        self._memory_index[event.payload_hash].append(event)
+        if memory_id:
+            memory_id = str(memory_id)
+            self._memory_index[memory_id].append(event)
+            self._event_memory_ids[event.id] = memory_id
         
         # Notify subscribers
         self._notify_subscribers(event)
+    
+    def _evict(self, event: AuditEvent):
+        """Drop the oldest retained event from every index (and spill it if configured)
         
-        return event
+        The evicted event is the oldest for each of its index keys, so every
+        removal is a popleft.
+        """
+        self._unindex(self._entity_index, event.entity)
+        self._unindex(self._memory_index, event.payload_hash)
+        memory_id = self._event_memory_ids.pop(event.id, None)
+        if memory_id:
+            self._unindex(self._memory_index, memory_id)
+        
+        self._cls_counts[event.classification] -= 1
+        if not self._cls_counts[event.classification]:
+            del self._cls_counts[event.classification]
+        
+        if AUDIT_SPILL_PATH:
+            self._spill(event)
+    
+    @staticmethod
+    def _unindex(index: Dict, key: str):
+        events = index[key]
+        events.popleft()
+        if not events:
+            del index[key]
+    
+    def _spill(self, event: AuditEvent):
+        """Append an evicted event to the spill log, fsyncing in batches"""
+        if self._spill_file is None:
+            self._spill_file = open(AUDIT_SPILL_PATH, 'ab')
+        self._spill_file.write(_json_bytes(event.model_dump()) + b"\n")
+        
+        self._spill_pending += 1
+        if self._spill_pending >= AUDIT_SPILL_FSYNC_EVERY:
+            self._spill_file.flush()
+            os.fsync(self._spill_file.fileno())
+            self._spill_pending = 0
+    
+    def _append_merkle(self, attestation_hash: str, timestamp: str, operation: str):
+        """Append a leaf and fold it into the Merkle frontier (O(log N))"""
+        index = len(self.merkle_log)
+        
+        # Integrity is checked once, at append time: the tail must still
+        # carry the hash we linked last, otherwise the log was altered.
+        if self.merkle_log and self._broken_at is None and self.merkle_log[-1].hash != self._last_hash:
+            self._broken_at = index - 1
+        
+        if self._dirty_from is None:
+            self._dirty_from = index
+        
+        node = bytes.fromhex(attestation_hash)
+        self.merkle_log.append(MerkleNode(node, self._last_hash, timestamp, operation))
+        self._last_hash = node
+        
+        # Carry the new leaf up through completed subtrees, like a binary counter
+        while index & 1:
+            node = _sha256(self._peaks.pop() + node).digest()
+            index >>= 1
+        self._peaks.append(node)
+        
+        # Bag the peaks right-to-left into the root
+        root = self._peaks[-1]
+        for peak in reversed(self._peaks[:-1]):
+            root = _sha256(peak + root).digest()
+        self._cached_root = root
     
     def _notify_subscribers(self, event: AuditEvent):
-        """Notify real-time audit subscribers"""
-        for subscriber_queue in audit_subscribers:
+        """Notify real-time audit subscribers (O(1) regardless of stream count)"""
+        self._ring.append(event)
+        self._published += 1
+        self._wake.set()  # Wakes every current waiter
+        self._wake.clear()
+    
+    def stream_cursor(self) -> int:
+        """Cursor positioned after the latest published event"""
+        return self._published
+    
+    async def wait_for_events(self, cursor: int, timeout: float) -> Tuple[List[AuditEvent], int]:
+        """Events published after cursor, waiting up to timeout for new ones
+        
+        Returns the events and the advanced cursor. Streams that fall more
+        than the ring size behind skip the overwritten events.
+        """
+        if cursor == self._published:
             try:
-                subscriber_queue.put_nowait(event)
-            except:
-                pass  # Skip full queues
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                return [], cursor
+        
+        pending = min(self._published - cursor, len(self._ring))
+        return list(islice(self._ring, len(self._ring) - pending, None)), self._published
     
     def get_audit_trail(self, entity: str = None, limit: int = 100) -> List[AuditEvent]:
         """Get audit trail for entity or global"""
-        if entity:
-            return [e for e in audit_events if e.entity == entity][-limit:]
-        return audit_events[-limit:]
+        events = self._entity_index.get(entity, ()) if entity else self._events
+        tail = list(islice(reversed(events), limit))
+        tail.reverse()
+        return tail
+    
+    def event_count(self) -> int:
+        """Number of retained events"""
+        return len(self._events)
+    
+    def classification_counts(self) -> Dict[str, int]:
+        """Event count per classification, maintained at append time"""
+        return dict(self._cls_counts)
+    
+    def find_memory_events(self, memory_id: str) -> List[AuditEvent]:
+        """Events logged for a memory_id (or exact payload hash), oldest first"""
+        return list(self._memory_index.get(memory_id, ()))
     
     def verify_merkle_chain(self) -> Dict:
-        """Verify local Merkle chain integrity"""
+        """Merkle chain integrity from the append-time checks (O(1))"""
+        if not self.merkle_log:
+            return {'valid': True, 'length': 0}
+        
+        if self._broken_at is not None:
+            return {
+                'valid': False,
+                'broken_at_index': self._broken_at,
+                'length': len(self.merkle_log)
+            }
+        
+        return {
+            'valid': True,
+            'length': len(self.merkle_log),
+            'latest_hash': self._last_hash.hex(),
+            'merkle_root': self._cached_root.hex()
+        }
+    
+    def verify_full(self, rescan: bool = False) -> Dict:
+        """Cold audit: walk the local Merkle chain from the first unverified link
+        
+        Links verified by an earlier call are skipped unless rescan is set.
+        """
         if not self.merkle_log:
             return {'valid': True, 'length': 0}
         
-        for i in range(1, len(self.merkle_log)):
+        if rescan:
+            start = 1
+        elif self._dirty_from is None:
+            start = len(self.merkle_log)
+        else:
+            start = max(1, self._dirty_from)
+
+        for i in range(start, len(self.merkle_log)):
             current = self.merkle_log[i]
             previous = self.merkle_log[i-1]
             
-            if current['previous'] != previous['hash']:
+            if current.previous != previous.hash:
+                self._dirty_from = i
                 return {
                     'valid': False, 
                     'broken_at_index': i,
                     'length': len(self.merkle_log)
                 }
         
+        self._dirty_from = None
         return {
             'valid': True, 
             'length': len(self.merkle_log),
-            'latest_hash': self.merkle_log[-1]['hash']
+            'latest_hash': self.merkle_log[-1].hash.hex()
         }
 
 # Initialize audit trail
@@ -123,7 +421,7 @@ async def log_audit_event(operation: str, entity: str, classification: str,
                          payload: Dict, user: str = 'system'):
     """Log audit event with cryptographic attestation"""
     try:
-        event = audit_trail.create_audit_event(operation, entity, classification, payload, user)
+        event = await audit_trail.acreate_audit_event(operation, entity, classification, payload, user)
         return {
             'logged': True,
             'event_id': event.id,
@@ -137,7 +435,7 @@ async def attest_memory(request: AttestationRequest):
     """Create cryptographic attestation for memory"""
     try:
         # Find memory in audit log
-        memory_events = [e for e in audit_events if request.memory_id in str(e.payload_hash)]
+        memory_events = audit_trail.find_memory_events(request.memory_id)
         
         if not memory_events:
             raise HTTPException(status_code=404, detail="Memory not found in audit log")
@@ -156,32 +454,47 @@ async def attest_memory(request: AttestationRequest):
         
         if request.include_provenance:
             # Add provenance from Neo4j
-            rag = GraphRAG()
-            provenance = await rag._get_provenance_trail(latest_event.entity)
+            from api.routers.rag import get_graph_rag
+            provenance = await get_graph_rag()._get_provenance_trail(latest_event.entity)
             attestation['provenance'] = provenance.get('records', [])
         
         return attestation
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _watch_disconnect(request: Request):
+    """Return once the client sends http.disconnect"""
+    while True:
+        message = await request.receive()
+        if message["type"] == "http.disconnect":
+            return
+
 @router.get("/stream")
 async def audit_stream(request: Request):
     """Real-time audit event stream (Server-Sent Events)"""
-    async def event_stream() -> AsyncGenerator[str, None]:
-        # Create subscriber queue
-        queue = asyncio.Queue(maxsize=100)
-        audit_subscribers.add(queue)
+    async def event_stream() -> AsyncGenerator[bytes, None]:
+        # Subscribe by tailing the shared ring from the current position
+        cursor = audit_trail.stream_cursor()
+        audit_trail.active_streams += 1
+        disconnect = asyncio.create_task(_watch_disconnect(request))
         
         try:
             while True:
-                # Check if client disconnected
-                if await request.is_disconnected():
+                # Block once, waking on new events, the keepalive timeout, or disconnect
+                waiter = asyncio.create_task(audit_trail.wait_for_events(cursor, timeout=30.0))
+                await asyncio.wait({waiter, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnect.done():
+                    waiter.cancel()
                     break
                 
-                try:
-                    # Wait for event with timeout
-                    event = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    
+                events, cursor = waiter.result()
+                
+                if not events:
+                    # Send keepalive
+                    yield _KEEPALIVE_PREFIX + datetime.utcnow().isoformat().encode() + _KEEPALIVE_SUFFIX
+                    continue
+                
+                for event in events:
                     # Format as SSE
                     event_data = {
                         'id': event.id,
@@ -192,23 +505,19 @@ async def audit_stream(request: Request):
                         'attestation_hash': event.attestation_hash[:16] + '...'  # Truncated for display
                     }
                     
-                    yield f"data: {json.dumps(event_data)}\n\n"
-                    
-                except asyncio.TimeoutError:
-                    # Send keepalive
-                    yield f"data: {{\"keepalive\": true, \"timestamp\": \"{datetime.utcnow().isoformat()}\"}}\n\n"
+                    yield _SSE_DATA + _json_bytes(event_data) + _SSE_END
                 
         finally:
             # Clean up subscriber
-            audit_subscribers.discard(queue)
+            disconnect.cancel()
+            audit_trail.active_streams -= 1
     
     return StreamingResponse(
         event_stream(),
-        media_type="text/plain",
+        media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Content-Type": "text/event-stream"
+            "Connection": "keep-alive"
         }
     )
 
@@ -239,17 +548,13 @@ async def audit_status():
     """Audit system status and metrics"""
     merkle_status = audit_trail.verify_merkle_chain()
     
-    # Classification breakdown
-    classification_counts = {}
-    for event in audit_events:
-        cls = event.classification
-        classification_counts[cls] = classification_counts.get(cls, 0) + 1
-    
     return {
-        'total_events': len(audit_events),
+        'total_events': audit_trail.event_count(),
         'merkle_integrity': merkle_status,
-        'active_streams': len(audit_subscribers),
-        'classification_breakdown': classification_counts,
+        'active_streams': audit_trail.active_streams,
+        'queued_events': audit_queue.qsize(),
+        'dropped_events': audit_queue_stats['dropped'],
+        'classification_breakdown': audit_trail.classification_counts(),
         'attestation_enabled': True,
         'compliance_level': 'federal_grade'
     }
@@ -257,4 +562,72 @@ async def audit_status():
 # Helper function for other routers to use
 def log_memory_operation(operation: str, entity: str, classification: str, payload: Dict, user: str = 'system'):
     """Helper to log memory operations from other routers"""
-    return audit_trail.create_audit_event(operation, entity, classification, payload, user)
\ No newline at end of file
+    return audit_trail.create_audit_event(operation, entity, classification, payload, user)
+
+async def alog_memory_operation(operation: str, entity: str, classification: str, payload: Dict, user: str = 'system'):
+    """Async helper for routers logging potentially large payloads"""
+    return await audit_trail.acreate_audit_event(operation, entity, classification, payload, user)
+
+def log_memory_operations(records: List[Dict]):
+    """Helper to log a burst of memory operations in one pass (used by the audit drainer)"""
+    return audit_trail.create_audit_events(records)
+
+# Deferred audit logging: request handlers enqueue and return; a background
+# drainer records queued operations in batches off the response path
+AUDIT_QUEUE_MAX = 10000
+AUDIT_BATCH_MAX = 256
+AUDIT_BATCH_MAX_WAIT = 0.5
+
+audit_queue = asyncio.Queue(maxsize=AUDIT_QUEUE_MAX)
+audit_queue_stats = {'dropped': 0}
+
+def queue_memory_operation(operation: str, entity: str, classification: str, payload: Dict, user: str = 'system'):
+    """Queue a memory operation for the audit drainer (dropped and counted if the queue is full)"""
+    try:
+        audit_queue.put_nowait({
+            'operation': operation,
+            'entity': entity,
+            'classification': classification,
+            'payload': payload,
+            'user': user,
+            'timestamp': datetime.utcnow().isoformat()
+        })
+    except asyncio.QueueFull:
+        audit_queue_stats['dropped'] += 1
+
+def _drain_queued_records(records: List[Dict]) -> List[Dict]:
+    """Move everything currently queued into records (non-blocking)"""
+    while len(records) < AUDIT_BATCH_MAX:
+        try:
+            records.append(audit_queue.get_nowait())
+        except asyncio.QueueEmpty:
+            break
+    return records
+
+async def run_audit_drainer():
+    """Record queued operations: up to AUDIT_BATCH_MAX per batch, waiting at most
+    AUDIT_BATCH_MAX_WAIT after the first for the batch to fill"""
+    loop = asyncio.get_running_loop()
+    while True:
+        records = [await audit_queue.get()]
+        deadline = loop.time() + AUDIT_BATCH_MAX_WAIT
+        try:
+            while len(_drain_queued_records(records)) < AUDIT_BATCH_MAX:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    records.append(await asyncio.wait_for(audit_queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            # Also runs on cancellation, so a half-filled batch is never lost
+            try:
+                log_memory_operations(records)
+            except Exception as e:
+                print(f"❌ Audit drain failed for {len(records)} events: {e}")
+
+def flush_audit_queue():
+    """Record whatever is still queued (called on shutdown after the drainer stops)"""
+    while not audit_queue.empty():
+        log_memory_operations(_drain_queued_records([]))
@@ -8,16 +8,24 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
+from collections import defaultdict
+import asyncio
 import json
 
 # Import components
 import sys
 sys.path.append('../..')
-from api.routers.rag import GraphRAG
+from api.routers.rag import get_graph_rag
 from core.memory_orchestrator.policy_engine import PolicyEngine
 
 router = APIRouter(prefix="/copilot", tags=["copilot"])
 
+# Shared by all copilots, like rag.get_graph_rag() (one instance per process)
+policy_engine = PolicyEngine()
+
+# Keywords that mark a memory as a performance signal
+_PERF_KEYWORDS = ('latency', 'slow', 'timeout')
+
 class CopilotRequest(BaseModel):
     task: str
     case: Optional[str] = None
@@ -35,19 +43,23 @@ class CopilotResponse(BaseModel):
 
 class LegalCopilot:
     def __init__(self):
-        self.rag = GraphRAG()
-        self.policy = PolicyEngine()
+        self.policy = policy_engine
         
     async def draft_motion(self, task: str, case: str, context: str = None) -> Dict:
         """Draft legal motion with memory-backed research"""
         # Gather relevant memories
         search_query = f"{case} {context or ''} motion legal precedent"
-        rag_result = await self.rag.hybrid_search(search_query, case, limit=20)
+        rag_result = await get_graph_rag().hybrid_search(search_query, case, limit=20)
         
         # Extract key facts and precedents
         memories = rag_result.get('results', [])
-        precedents = [m for m in memories if 'precedent' in m.get('content', '').lower()]
-        facts = [m for m in memories if m.get('classification') == 'evidence']
+        precedents = []
+        facts = []
+        for m in memories:
+            if 'precedent' in m.get('content', '').lower():
+                precedents.append(m)
+            if m.get('classification') == 'evidence':
+                facts.append(m)
         
         # Build motion structure
         motion_parts = {
@@ -79,10 +91,12 @@ CONCLUSION
 {motion_parts['conclusion']}
         """.strip()
         
+        confidences = [c['confidence'] for c in motion_parts['citations']]
+        
         return {
             'output': motion_text,
             'citations': motion_parts['citations'],
-            'confidence': np.mean([c['confidence'] for c in motion_parts['citations']]) if motion_parts['citations'] else 0,
+            'confidence': sum(confidences) / len(confidences) if confidences else 0.0,
             'next_actions': [
                 'Review citations for accuracy',
                 'Add specific statutory references',
@@ -121,18 +135,21 @@ CONCLUSION
         return "\n\n".join(arg_points)
 
 class OpsCopilot:
-    def __init__(self):
-        self.rag = GraphRAG()
-        
     async def deployment_analysis(self, task: str, context: str = None) -> Dict:
         """Analyze deployment health and recommend actions"""
         # Get system memories about deployments, errors, performance
         search_query = f"deployment {context or ''} error performance health"
-        rag_result = await self.rag.hybrid_search(search_query, 'system', limit=15)
+        rag_result = await get_graph_rag().hybrid_search(search_query, 'system', limit=15)
         
         memories = rag_result.get('results', [])
-        errors = [m for m in memories if 'error' in m.get('content', '').lower()]
-        performance = [m for m in memories if any(word in m.get('content', '').lower() for word in ['latency', 'slow', 'timeout'])]
+        errors = []
+        performance = []
+        for m in memories:
+            content = m.get('content', '').lower()  # Lowercase once per memory
+            if 'error' in content:
+                errors.append(m)
+            if any(word in content for word in _PERF_KEYWORDS):
+                performance.append(m)
         
         # Generate recommendations
         recommendations = []
@@ -172,9 +189,6 @@ NEXT MONITORING:
         }
 
 class ResearchCopilot:
-    def __init__(self):
-        self.rag = GraphRAG()
-        
     async def synthesize_research(self, task: str, context: str = None) -> Dict:
         """Cross-source research synthesis with graph disambiguation"""
         # Multi-angle search
@@ -182,18 +196,16 @@ class ResearchCopilot:
         if context:
             queries.extend([f"{task} {context}", f"{context} analysis"])
         
-        all_results = []
-        for query in queries[:3]:  # Limit to 3 searches
-            rag_result = await self.rag.hybrid_search(query, limit=8)
-            all_results.extend(rag_result.get('results', []))
+        # Independent searches - overlap their latency
+        rag_results = await asyncio.gather(
+            *(get_graph_rag().hybrid_search(query, limit=8) for query in queries[:3])  # Limit to 3 searches
+        )
+        all_results = [r for rag_result in rag_results for r in rag_result.get('results', [])]
         
         # Dedupe and cluster by entity/topic
-        entity_clusters = {}
+        entity_clusters = defaultdict(list)
         for result in all_results:
-            entity = result.get('entity', 'unknown')
-            if entity not in entity_clusters:
-                entity_clusters[entity] = []
-            entity_clusters[entity].append(result)
+            entity_clusters[result.get('entity', 'unknown')].append(result)
         
         # Synthesize by cluster
         synthesis_parts = []
@@ -8,17 +8,88 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
 import asyncio
-import numpy as np
+import hashlib
+import os
 from datetime import datetime
 
 # Import components
 import sys
 sys.path.append('../..')
-from graph.neo4j_client import Neo4jClient
+from api.responses import FastJSONResponse
+from graph.neo4j_client import Neo4jClient, escape_fulltext
 from providers.supermemory import SuperMemoryProvider
 from providers.mem0 import Mem0Provider
 
-router = APIRouter(prefix="/rag", tags=["rag"])
+# Search handlers return FastJSONResponse directly: the payloads are plain
+# dicts built here, so FastAPI's jsonable_encoder pass would be redundant
+router = APIRouter(prefix="/rag", tags=["rag"], default_response_class=FastJSONResponse)
+
+# Hybrid search deadlines (seconds): a branch still running at the deadline is
+# dropped and the response is marked degraded instead of waiting on it
+HYBRID_DEADLINE_S = float(os.getenv('RAG_HYBRID_DEADLINE', '10'))
+PROVENANCE_DEADLINE_S = float(os.getenv('RAG_PROVENANCE_DEADLINE', '0.5'))
+
+async def _settle(aws: List, timeout: float) -> List[Any]:
+    """Run awaitables concurrently for at most timeout seconds
+    
+    Returns one entry per awaitable: its result, or None if it raised or
+    was still running at the deadline (those are cancelled).
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    return [
+        task.result() if task in done and not task.cancelled() and task.exception() is None else None
+        for task in tasks
+    ]
+
+# Graph search Cypher, built once per traversal depth. Cypher can't take the
+# variable-length bound as a parameter, so each depth gets its own fixed text
+# and Neo4j caches one plan per depth instead of re-planning every request.
+# Matching goes through the memory_fts full-text index (see Neo4jClient) rather
+# than a CONTAINS scan over every Memory node.
+_MAX_GRAPH_DEPTH = 5
+
+# Scoring, ordering and the result window all run in Neo4j, so only the rows
+# the caller can use cross the wire. Lucene scores are unbounded; they are
+# scaled to 0-1 by the best hit before blending with proximity (0.7/0.3),
+# plus a chain-of-custody boost.
+_CYPHER_SCORE_AND_LIMIT = """
+WITH collect({m: m, score: score, path_length: path_length, custody_events: custody_events}) AS rows,
+     max(score) AS max_score
+UNWIND rows AS row
+WITH row, row.score / CASE WHEN max_score > 0 THEN max_score ELSE 1.0 END AS text_score
+RETURN row.m AS m, row.path_length AS path_length, row.custody_events AS custody_events, text_score,
+       text_score * 0.7 + 0.3 / (row.path_length + 1)
+         + CASE WHEN row.custody_events > 0 THEN 0.2 ELSE 0.0 END AS graph_score
+ORDER BY graph_score DESC
+LIMIT $limit
+"""
+_CYPHER_ENTITY_TEMPLATE = """
+CALL db.index.fulltext.queryNodes('memory_fts', $query) YIELD node AS m, score
+MATCH (start:Entity {name: $entity})
+MATCH path = shortestPath((start)-[*1..%d]-(m))
+WITH m, score, length(path) as path_length
+OPTIONAL MATCH (m)-[:CUSTODY_EVENT]->(c:CustodyEvent)
+WITH m, score, path_length, count(c) as custody_events
+""" + _CYPHER_SCORE_AND_LIMIT.replace('%', '%%')
+_CYPHER_ENTITY = {
+    depth: _CYPHER_ENTITY_TEMPLATE % depth for depth in range(1, _MAX_GRAPH_DEPTH + 1)
+}
+_CYPHER_NO_ENTITY = """
+CALL db.index.fulltext.queryNodes('memory_fts', $query) YIELD node AS m, score
+OPTIONAL MATCH (m)-[:CUSTODY_EVENT]->(c:CustodyEvent)
+WITH m, score, 1 as path_length, count(c) as custody_events
+""" + _CYPHER_SCORE_AND_LIMIT
+
+def _content_key(result: Dict) -> bytes:
+    """Stable dedupe key for a result's content
+    
+    BLAKE2b (64-bit digest) over the UTF-8 bytes: unlike hash(str) it is the
+    same in every process, so it stays valid if results are ever cached.
+    """
+    return hashlib.blake2b(result.get('content', '').encode(), digest_size=8).digest()
 
 class RAGQuery(BaseModel):
     query: str
@@ -57,59 +128,34 @@ class GraphRAG:
         
         return results
     
-    async def graph_search(self, query: str, entity: str = None, depth: int = 3) -> List[Dict]:
-        """Graph traversal search with entity context"""
+    async def graph_search(self, query: str, entity: str = None, depth: int = 3, limit: int = 10) -> List[Dict]:
+        """Graph traversal search with entity context
+        
+        Neo4j returns up to 3x limit rows (10-50), already scored and sorted.
+        """
         if not self.neo4j.driver:
             return []
         
         # Build entity-aware Cypher query
+        params = {'query': escape_fulltext(query), 'limit': min(max(limit * 3, 10), 50)}
         if entity:
-            cypher = """
-            MATCH (start:Entity {name: $entity})
-            MATCH path = (start)-[*1..{depth}]-(m:Memory)
-            WHERE m.content CONTAINS $query
-            WITH m, path, length(path) as path_length
-            OPTIONAL MATCH (m)-[:CUSTODY_EVENT]->(c:CustodyEvent)
-            OPTIONAL MATCH (m)-[:DERIVED_FROM]->(source:Memory)
-            RETURN m, path, path_length, collect(c) as custody, collect(source) as sources
-            ORDER BY path_length ASC, m.created_at DESC
-            LIMIT $limit
-            """.format(depth=depth)
-            
-            params = {'entity': entity, 'query': query, 'limit': 20}
+            cypher = _CYPHER_ENTITY[min(max(depth, 1), _MAX_GRAPH_DEPTH)]
+            params['entity'] = entity
         else:
-            cypher = """
-            MATCH (m:Memory)
-            WHERE m.content CONTAINS $query
-            OPTIONAL MATCH path = (m)-[:RELATES_TO*1..2]-(e:Entity)
-            OPTIONAL MATCH (m)-[:CUSTODY_EVENT]->(c:CustodyEvent)
-            RETURN m, path, collect(c) as custody
-            ORDER BY m.created_at DESC
-            LIMIT $limit
-            """
-            
-            params = {'query': query, 'limit': 20}
-        
-        result = await self.neo4j.cypher(cypher, params)
-        graph_results = []
+            cypher = _CYPHER_NO_ENTITY
         
-        for record in result.get('records', []):
-            memory = record.get('m', {})
-            path_length = record.get('path_length', 1)
-            custody = record.get('custody', [])
-            
-            # Calculate graph relevance score
-            graph_score = 1.0 / (path_length + 1)  # Closer entities score higher
-            if custody:
-                graph_score += 0.2  # Boost for chain-of-custody
-            
-            graph_results.append({
-                **memory,
-                'graph_score': graph_score,
-                'path_length': path_length,
-                'custody_events': len(custody),
+        result = await self.neo4j.cypher(cypher, params, read=True)
+        graph_results = [
+            {
+                **(record.get('m') or {}),
+                'graph_score': record.get('graph_score', 0.0),
+                'path_length': record.get('path_length', 1),
+                'text_score': record.get('text_score', 0.0),
+                'custody_events': record.get('custody_events', 0),
                 'search_type': 'graph'
-            })
+            }
+            for record in result.get('records', [])
+        ]
         
         return graph_results
     
@@ -117,12 +163,19 @@ class GraphRAG:
         """Hybrid semantic + graph search with learned ranking"""
         start_time = datetime.utcnow()
         
-        # Run searches in parallel
-        semantic_task = asyncio.create_task(self.semantic_search(query, limit * 2))
-        graph_task = asyncio.create_task(self.graph_search(query, entity, 3))
+        # Provenance only needs the entity, so it runs alongside the searches
+        provenance_task = None
+        if include_provenance and entity:
+            provenance_task = asyncio.create_task(self._get_provenance_trail(entity))
         
-        semantic_results = await semantic_task
-        graph_results = await graph_task
+        # Run searches in parallel, bounded by the slower branch's deadline
+        semantic_results, graph_results = await _settle(
+            [self.semantic_search(query, limit * 2), self.graph_search(query, entity, 3, limit)],
+            HYBRID_DEADLINE_S
+        )
+        degraded = semantic_results is None or graph_results is None
+        semantic_results = semantic_results or []
+        graph_results = graph_results or []
         
         # Hybrid ranking algorithm
         all_results = []
@@ -130,7 +183,7 @@ class GraphRAG:
         
         # Process semantic results
         for result in semantic_results:
-            content_hash = hash(result.get('content', ''))
+            content_hash = _content_key(result)
             if content_hash not in result_map:
                 result_map[content_hash] = {
                     **result,
@@ -140,7 +193,7 @@ class GraphRAG:
         
         # Blend in graph results (boost scores for matches)
         for result in graph_results:
-            content_hash = hash(result.get('content', ''))
+            content_hash = _content_key(result)
             graph_boost = result.get('graph_score', 0.5) * 0.4
             
             if content_hash in result_map:
@@ -164,11 +217,14 @@ class GraphRAG:
             reverse=True
         )[:limit]
         
-        # Add provenance if requested
+        # Add provenance if requested (given a short grace period past the searches)
         provenance = []
-        if include_provenance and entity:
-            prov_result = await self._get_provenance_trail(entity)
-            provenance = prov_result.get('records', [])
+        if provenance_task:
+            prov_result, = await _settle([provenance_task], PROVENANCE_DEADLINE_S)
+            if prov_result is None:
+                degraded = True
+            else:
+                provenance = prov_result.get('records', [])
         
         execution_time = (datetime.utcnow() - start_time).total_seconds()
         
@@ -178,7 +234,11 @@ class GraphRAG:
             'confidence_scores': {
                 'semantic_weight': 0.6,
                 'graph_weight': 0.4,
-                'avg_confidence': np.mean([r.get('hybrid_score', 0) for r in sorted_results]) if sorted_results else 0
+                'avg_confidence': (
+                    sum(r.get('hybrid_score', 0) for r in sorted_results) / len(sorted_results)
+                    if sorted_results else 0
+                ),
+                'degraded': degraded
             },
             'execution_time': execution_time,
             'result_counts': {
@@ -200,53 +260,62 @@ class GraphRAG:
         LIMIT 50
         """
         
-        return await self.neo4j.cypher(cypher, {'entity': entity})
+        return await self.neo4j.cypher(cypher, {'entity': entity}, read=True)
+
+# Graph-RAG engine, built on first use: Neo4jClient() connects and creates
+# its indexes synchronously, so the server builds it in lifespan() off the loop
+_graph_rag: Optional[GraphRAG] = None
 
-# Initialize Graph-RAG engine
-graph_rag = GraphRAG()
+def get_graph_rag() -> GraphRAG:
+    """Shared Graph-RAG engine (one per process)"""
+    global _graph_rag
+    if _graph_rag is None:
+        _graph_rag = GraphRAG()
+    return _graph_rag
 
-@router.post("/semantic", response_model=Dict)
+@router.post("/semantic")
 async def semantic_search(query: RAGQuery):
     """Semantic vector search across memory providers"""
     try:
-        results = await graph_rag.semantic_search(query.query, query.limit)
-        return {
+        results = await get_graph_rag().semantic_search(query.query, query.limit)
+        return FastJSONResponse({
             'results': results,
             'search_type': 'semantic',
             'query': query.query
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/graph", response_model=Dict)
+@router.post("/graph")
 async def graph_search(query: RAGQuery):
     """Graph traversal search with entity context"""
     try:
-        results = await graph_rag.graph_search(
+        results = await get_graph_rag().graph_search(
             query.query, 
             query.entity, 
-            query.max_graph_depth or 3
+            query.max_graph_depth or 3,
+            query.limit or 10
         )
-        return {
+        return FastJSONResponse({
             'results': results,
             'search_type': 'graph',
             'query': query.query,
             'entity': query.entity
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/hybrid", response_model=Dict)
+@router.post("/hybrid")
 async def hybrid_search(query: RAGQuery):
     """Hybrid semantic + graph search with learned ranking"""
     try:
-        result = await graph_rag.hybrid_search(
+        result = await get_graph_rag().hybrid_search(
             query.query,
             query.entity,
             query.limit,
             query.include_provenance
         )
-        return result
+        return FastJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
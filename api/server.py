@@ -6,13 +6,17 @@ Unified REST API with Graph-RAG, Copilots, Audit, Ingestion, and Self-Healing Op
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from api.middleware.cors import StaticCORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import os
 import sys
 import time
 import asyncio
+import functools
+import logging
 from typing import Dict, List, Optional
 from contextlib import asynccontextmanager
 from datetime import datetime
@@ -21,14 +25,16 @@ from datetime import datetime
 sys.path.append('..')
 from core.memory_orchestrator.aggregator_mcp import MemoryAggregator
 from graph.neo4j_client import Neo4jClient
+from providers.http_client import aclose_client
 from observers.metrics import metrics, LatencyTimer
-from api.routers.audit import log_memory_operation
+from api.responses import FastJSONResponse, EncodedJSONResponse, dumps
+from api.routers.audit import queue_memory_operation, run_audit_drainer, flush_audit_queue
 
 # Import all routers
-from api.routers.rag import router as rag_router
+from api.routers.rag import router as rag_router, get_graph_rag
 from api.routers.copilot import router as copilot_router  
 from api.routers.audit import router as audit_router
-from api.routers.ingest import router as ingest_router
+from api.routers.ingest import router as ingest_router, ingestion_pipeline, ingest_queue, ingest_stats
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -36,17 +42,36 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting GlacierEQ Memory Master API Server")
     print("===============================================")
     
+    # Module loggers (e.g. ingest) go to stderr; LOG_LEVEL=DEBUG adds per-item detail
+    logging.basicConfig(
+        level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    
     # Set start time for uptime calculation
     app.state.start_time = time.time()
     
-    # Initialize components
+    # Initialize components here rather than at import, so importing the app
+    # opens no connections; construction (driver connect) runs off the loop.
+    # The graph endpoints reuse the aggregator's Neo4j client.
+    global memory_aggregator, neo4j_client
     print("⚙️ Initializing core components...")
-    memory_aggregator = MemoryAggregator()
-    neo4j_client = Neo4jClient()
+    memory_aggregator, graph_rag = await asyncio.gather(
+        asyncio.to_thread(MemoryAggregator), asyncio.to_thread(get_graph_rag)
+    )
+    neo4j_client = memory_aggregator.neo4j
+    # Open Bolt connections now so the first requests skip the handshake
+    await asyncio.gather(neo4j_client.warm_up(), graph_rag.neo4j.warm_up())
     
     # Start background metrics collection
     print("📊 Starting metrics collection...")
-    metrics_task = asyncio.create_task(_metrics_collector())
+    metrics_tasks = [asyncio.create_task(_slo_watcher()), asyncio.create_task(_stats_refresher())]
+    
+    # Audit events from request handlers are recorded in the background
+    audit_task = asyncio.create_task(run_audit_drainer())
+    
+    # Ingestion daemon runs for the app's lifetime, ahead of the first request
+    await ingestion_pipeline.start_daemon(memory_aggregator)
     
     print("✅ All systems initialized")
     print(f"🎯 API Server ready: http://localhost:8080")
@@ -57,24 +82,48 @@ async def lifespan(app: FastAPI):
     yield
     
     print("🛑 Shutting down GlacierEQ Memory Master")
-    metrics_task.cancel()
+    # Stop ingestion first so no batch is still writing when the clients close
+    await ingestion_pipeline.stop_daemon()
+    for task in metrics_tasks:
+        task.cancel()
+    audit_task.cancel()
+    await asyncio.gather(audit_task, return_exceptions=True)  # Records its in-flight batch
+    flush_audit_queue()
+    
+    # Release pooled Bolt and provider HTTP connections
+    await asyncio.gather(neo4j_client.close(), graph_rag.neo4j.close(), aclose_client(), return_exceptions=True)
 
 # Create FastAPI app with lifespan
 app = FastAPI(
     title="GlacierEQ Memory Master API",
     description="Sovereign Memory Architecture with Graph-RAG, Copilots, and Federal Compliance",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
-# CORS for Sigma frontend and external access
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# CORS for Sigma frontend and external access (comma-separated CORS_ALLOW_ORIGINS;
+# set it in production instead of relying on the wildcard default)
+_cors_origins = [origin.strip() for origin in os.getenv('CORS_ALLOW_ORIGINS', '*').split(',') if origin.strip()]
+if _cors_origins == ['*']:
+    # Allow-all needs no origin matching: fixed headers, no per-request parsing
+    app.add_middleware(StaticCORSMiddleware)
+else:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=_cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+# Compress large JSON responses (RAG results, provenance trails); Brotli when
+# brotli-asgi is installed, which still serves gzip to clients without br
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=1024)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # Mount static files for embedded UI (if exists)
 if os.path.exists("static"):
@@ -86,9 +135,36 @@ app.include_router(copilot_router)
 app.include_router(audit_router)
 app.include_router(ingest_router)
 
-# Initialize global components
-memory_aggregator = MemoryAggregator()
-neo4j_client = Neo4jClient()
+# Global components, created in lifespan()
+memory_aggregator: Optional[MemoryAggregator] = None
+neo4j_client: Optional[Neo4jClient] = None
+
+def _ttl_cache(ttl: float):
+    """Cache a no-argument coroutine's result for ttl seconds
+    
+    Probes hit the status endpoints every few seconds; concurrent misses share
+    one refresh instead of each hitting the backend.
+    """
+    def decorator(func):
+        cached = {'expires': 0.0, 'value': None}
+        lock = asyncio.Lock()
+        
+        @functools.wraps(func)
+        async def wrapper():
+            if time.monotonic() < cached['expires']:
+                return cached['value']
+            async with lock:
+                if time.monotonic() >= cached['expires']:
+                    cached['value'] = await func()
+                    cached['expires'] = time.monotonic() + ttl
+            return cached['value']
+        return wrapper
+    return decorator
+
+@_ttl_cache(2.0)
+async def _memory_stats() -> Dict:
+    """Neo4j memory statistics, shared by status probes for up to 2 seconds"""
+    return await neo4j_client.get_memory_stats() if neo4j_client.driver else {}
 
 # Pydantic models
 class MemoryWrite(BaseModel):
@@ -111,11 +187,16 @@ class CypherQuery(BaseModel):
     query: str
     params: Optional[Dict] = None
 
+@functools.lru_cache(maxsize=512)
+def _endpoint_label(path: str) -> str:
+    """Metric label for a route template, e.g. /memory/{id} -> memory_{id}"""
+    return path.replace('/', '_').strip('_') or 'root'
+
 # Middleware for automatic metrics collection
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
     """Collect metrics for all API requests"""
-    start_time = time.time()
+    start_time = time.perf_counter()
     
     # Increment request counter
     metrics.increment_counter('api_requests_total')
@@ -124,8 +205,16 @@ async def metrics_middleware(request: Request, call_next):
         response = await call_next(request)
         
         # Record successful request latency
-        latency_ms = (time.time() - start_time) * 1000
-        endpoint = request.url.path.replace('/', '_').strip('_') or 'root'
+        latency_ms = (time.perf_counter() - start_time) * 1000
+        # Label by the matched route template, not the raw path, so path
+        # parameters don't mint a new metric series per request
+        route = request.scope.get('route')
+        if route is not None:
+            endpoint = _endpoint_label(route.path)
+        elif request.scope['path'] in _RAW_ROUTE_PATHS:
+            endpoint = _endpoint_label(request.scope['path'])  # Plain Starlette routes set no 'route'
+        else:
+            endpoint = 'unmatched'
         metrics.record_latency(f'api_latency_{endpoint}', latency_ms)
         
         return response
@@ -133,38 +222,41 @@ async def metrics_middleware(request: Request, call_next):
     except Exception as e:
         # Record error
         metrics.increment_counter('api_errors_total')
-        latency_ms = (time.time() - start_time) * 1000
+        latency_ms = (time.perf_counter() - start_time) * 1000
         metrics.record_latency('api_error_latency', latency_ms)
         raise
 
-# Core API endpoints
-@app.get("/")
-async def root():
+# Polling endpoints (/, /health, /metrics) take no parameters, so they are
+# registered as plain Starlette routes below: no dependency resolution or
+# response-model wrapping per hit, and they serve pre-encoded bodies
+_ROOT_BODY = dumps({
+    "service": "GlacierEQ Memory Master API",
+    "version": "1.0.0",
+    "status": "operational",
+    "case_support": "1FDV-23-0001009",
+    "capabilities": [
+        "memory_operations", "graph_rag", "domain_copilots", 
+        "audit_compliance", "multi_modal_ingestion", "self_healing_ops"
+    ],
+    "endpoints": {
+        "memory": "/memory/{write,search,forget}",
+        "graph_rag": "/rag/{semantic,graph,hybrid}",
+        "copilots": "/copilot/{legal,ops,research}",
+        "audit": "/audit/{stream,trail,attest}",
+        "ingestion": "/ingest/{item,bulk,document}",
+        "metrics": "/metrics",
+        "health": "/health"
+    },
+    "sigma_config": "ui/sigma/config.json"
+})
+
+async def root(request: Request):
     """API root with system overview"""
-    return {
-        "service": "GlacierEQ Memory Master API",
-        "version": "1.0.0",
-        "status": "operational",
-        "case_support": "1FDV-23-0001009",
-        "capabilities": [
-            "memory_operations", "graph_rag", "domain_copilots", 
-            "audit_compliance", "multi_modal_ingestion", "self_healing_ops"
-        ],
-        "endpoints": {
-            "memory": "/memory/{write,search,forget}",
-            "graph_rag": "/rag/{semantic,graph,hybrid}",
-            "copilots": "/copilot/{legal,ops,research}",
-            "audit": "/audit/{stream,trail,attest}",
-            "ingestion": "/ingest/{item,bulk,document}",
-            "metrics": "/metrics",
-            "health": "/health"
-        },
-        "sigma_config": "ui/sigma/config.json"
-    }
+    return EncodedJSONResponse(_ROOT_BODY)
 
-@app.get("/health")
-async def health():
-    """Comprehensive system health with SLO status"""
+@_ttl_cache(1.0)
+async def _health_body() -> bytes:
+    """Health payload, encoded at most once a second"""
     neo4j_status = "connected" if neo4j_client.driver else "disconnected"
     
     # Check service connectivity
@@ -179,7 +271,7 @@ async def health():
     slo_dashboard = metrics.get_slo_dashboard()
     overall_health = slo_dashboard['overall_health']
     
-    return {
+    return dumps({
         "status": "ok" if overall_health == "GREEN" else "degraded", 
         "overall_health": overall_health,
         "services": services,
@@ -187,13 +279,17 @@ async def health():
         "case_number": "1FDV-23-0001009",
         "uptime_seconds": time.time() - app.state.start_time if hasattr(app.state, 'start_time') else 0,
         "memory_providers": ["mem0", "supermemory", "neo4j"]
-    }
+    })
+
+async def health(request: Request):
+    """Comprehensive system health with SLO status"""
+    return EncodedJSONResponse(await _health_body())
 
 @app.get("/memory/status")
 async def memory_status():
     """Memory system status and statistics"""
     with LatencyTimer('memory_status_latency'):
-        stats = await neo4j_client.get_memory_stats() if neo4j_client.driver else {}
+        stats = await _memory_stats()
         
         return {
             "graph_stats": stats,
@@ -221,7 +317,7 @@ async def write_memory(request: MemoryWrite):
             )
             
             # Log to audit trail
-            log_memory_operation(
+            queue_memory_operation(
                 'write_memory',
                 request.entity,
                 request.classification or 'general',
@@ -229,6 +325,7 @@ async def write_memory(request: MemoryWrite):
             )
             
             metrics.increment_counter('memory_operations_total')
+            request_stats_refresh()
             return result
         except Exception as e:
             metrics.increment_counter('memory_write_errors_total')
@@ -247,7 +344,7 @@ async def search_memory(request: MemorySearch):
             )
             
             # Log to audit trail
-            log_memory_operation(
+            queue_memory_operation(
                 'search_memory',
                 request.entity or 'global_search',
                 'search_operation',
@@ -271,7 +368,7 @@ async def forget_memory(request: MemoryForget):
             )
             
             # Log to audit trail  
-            log_memory_operation(
+            queue_memory_operation(
                 'forget_memory',
                 'memory_deletion',
                 'compliance_action',
@@ -310,18 +407,30 @@ async def traverse_graph(start_entity: str, relationship: str, depth: int = 3):
             raise HTTPException(status_code=500, detail=str(e))
 
 # Metrics and observability endpoints
-@app.get("/metrics")
-async def prometheus_metrics():
+async def prometheus_metrics(request: Request):
     """Prometheus-compatible metrics export"""
-    return PlainTextResponse(
-        metrics.get_prometheus_metrics(),
-        media_type="text/plain"
-    )
+    # Streamed in ~8KB chunks from an async generator: formatting stays on
+    # the event loop (no threadpool hop) and the payload is never built whole.
+    # Quantiles are read once, when the scrape arrives.
+    snapshot = metrics.snapshot()
+    
+    async def chunks():
+        for chunk in metrics.iter_prometheus_lines(snapshot=snapshot):
+            yield chunk
+    
+    return StreamingResponse(chunks(), media_type="text/plain; version=0.0.4")
+
+_RAW_ROUTE_PATHS = frozenset(("/", "/health", "/metrics"))
+app.add_route("/", root, methods=["GET"])
+app.add_route("/health", health, methods=["GET"])
+app.add_route("/metrics", prometheus_metrics, methods=["GET"])
 
 @app.get("/metrics/slo")
 async def slo_dashboard():
     """SLO dashboard with violation status and remediation"""
-    return metrics.get_slo_dashboard()
+    # Returned as a response directly so the nested dashboard skips
+    # FastAPI's jsonable_encoder walk
+    return FastJSONResponse(metrics.get_slo_dashboard())
 
 @app.post("/ops/remediate")
 async def trigger_remediation(violation_type: str):
@@ -342,7 +451,7 @@ async def trigger_remediation(violation_type: str):
         result = await remediation_func(mock_violation)
         
         # Log remediation to audit
-        log_memory_operation(
+        queue_memory_operation(
             'manual_remediation',
             'system_ops',
             'operational',
@@ -361,6 +470,11 @@ async def trigger_remediation(violation_type: str):
 @app.get("/env/status")
 async def env_status():
     """Environment configuration with security masking"""
+    return EncodedJSONResponse(await _env_status_body())
+
+@_ttl_cache(10.0)
+async def _env_status_body() -> bytes:
+    """Encoded environment status; hits within the TTL don't serialise again"""
     required_vars = [
         'NEO4J_URI', 'NEO4J_USER', 'NEO4J_PASSWORD',
         'MEM0_API_KEY', 'SUPERMEMORY_API_KEY'
@@ -375,15 +489,25 @@ async def env_status():
             "masked_value": f"{value[:4]}...{value[-4:]}" if value and len(value) > 8 else "[not set]"
         }
     
-    return {
+    return dumps({
         "environment": status,
         "case_number": os.getenv('CASE_NUMBER', '1FDV-23-0001009'),
         "forensic_logging": os.getenv('FORENSIC_LOGGING', 'true'),
         "deployment_timestamp": datetime.utcnow().isoformat(),
         "system_health": metrics.get_slo_dashboard()['overall_health']
-    }
+    })
+
+def _has_file(path: str) -> bool:
+    """True if path directly contains a file; stops at the first one found"""
+    # scandir entries carry their type, so no stat call per entry
+    try:
+        with os.scandir(path) as entries:
+            return any(entry.is_file() for entry in entries)
+    except OSError:
+        return False
 
 @app.get("/migration/status")
+@_ttl_cache(10.0)
 async def migration_status():
     """Repository consolidation migration status"""
     # Check if Phase 1 directories exist
@@ -397,7 +521,7 @@ async def migration_status():
     migration_status = {}
     for module_path, source_repo in phase1_modules.items():
         module_exists = os.path.exists(module_path)
-        has_files = len([f for f in os.listdir(module_path) if os.path.isfile(os.path.join(module_path, f))]) > 0 if module_exists else False
+        has_files = module_exists and _has_file(module_path)
         
         migration_status[source_repo] = {
             'migrated': module_exists and has_files,
@@ -415,55 +539,78 @@ async def migration_status():
         'next_phase': 'Phase 2 - Graph Memory Systems' if completed == len(phase1_modules) else None
     }
 
-# Background metrics collector task
-async def _metrics_collector():
-    """Background task for system metrics and auto-remediation"""
+# Background metrics: cheap in-process SLO checks run often; the Neo4j
+# stats query runs on a slow timer or when a write asks for a refresh
+SLO_CHECK_INTERVAL_S = 5
+STATS_REFRESH_INTERVAL_S = 300
+STATS_MIN_INTERVAL_S = 5  # Floor between refreshes under a stream of writes
+REMEDIATION_COOLDOWN_S = 30  # Per runbook, so a sustained violation isn't re-fired every check
+
+_stats_refresh = asyncio.Event()
+
+def request_stats_refresh():
+    """Ask the stats refresher to query Neo4j ahead of its slow timer"""
+    _stats_refresh.set()
+
+async def _slo_watcher():
+    """Publish ingestion gauges, check SLOs and trigger auto-remediation"""
+    last_remediation: Dict[str, float] = {}
     while True:
         try:
-            # Update system metrics
-            if neo4j_client.driver:
-                stats = await neo4j_client.get_memory_stats()
-                metrics.set_gauge('memory_count', stats.get('memory_count', 0))
-                metrics.set_gauge('entity_count', stats.get('entity_count', 0))
-                metrics.set_gauge('custody_events_count', stats.get('custody_events', 0))
-            
-            # Update ingestion queue metrics
-            try:
-                from api.routers.ingest import ingest_stats
-                metrics.set_gauge('ingestion_queue_depth', ingest_stats['queued'])
-                metrics.set_gauge('ingestion_processing', ingest_stats['processing'])
-                metrics.set_gauge('ingestion_completed', ingest_stats['completed'])
-                metrics.set_gauge('ingestion_failed', ingest_stats['failed'])
-            except:
-                pass  # Ingestion stats not available yet
+            metrics.set_gauge('ingestion_queue_depth', await ingest_queue.depth())
+            metrics.set_gauge('ingestion_processing', ingest_stats['processing'])
+            metrics.set_gauge('ingestion_completed', ingest_stats['completed'])
+            metrics.set_gauge('ingestion_failed', ingest_stats['failed'])
             
             # Check for SLO violations and trigger auto-remediation
-            violations = metrics.check_slo_violations()
-            for violation in violations:
+            now = time.monotonic()
+            for violation in metrics.check_slo_violations():
                 if violation['severity'] == 'high':
                     remediation_type = violation['remediation']
-                    if remediation_type in metrics.runbooks:
-                        print(f"🚨 Auto-remediation triggered: {remediation_type}")
-                        try:
-                            remediation_result = await metrics.runbooks[remediation_type](violation)
-                            
-                            # Log remediation to audit
-                            log_memory_operation(
-                                'auto_remediation',
-                                'system_ops',
-                                'operational',
-                                {'violation': violation, 'result': remediation_result}
-                            )
-                        except Exception as e:
-                            print(f"❌ Auto-remediation failed for {remediation_type}: {e}")
+                    if remediation_type not in metrics.runbooks:
+                        continue
+                    if now - last_remediation.get(remediation_type, -REMEDIATION_COOLDOWN_S) < REMEDIATION_COOLDOWN_S:
+                        continue
+                    last_remediation[remediation_type] = now
+                    print(f"🚨 Auto-remediation triggered: {remediation_type}")
+                    try:
+                        remediation_result = await metrics.runbooks[remediation_type](violation)
+                        
+                        # Log remediation to audit
+                        queue_memory_operation(
+                            'auto_remediation',
+                            'system_ops',
+                            'operational',
+                            {'violation': violation, 'result': remediation_result}
+                        )
+                    except Exception as e:
+                        print(f"❌ Auto-remediation failed for {remediation_type}: {e}")
             
-            # Sleep for next collection cycle
-            await asyncio.sleep(30)  # Collect every 30 seconds
+            await asyncio.sleep(SLO_CHECK_INTERVAL_S)
             
         except Exception as e:
-            print(f"⚠️  Metrics collection error: {e}")
+            print(f"⚠️  SLO check error: {e}")
             await asyncio.sleep(60)  # Longer sleep on error
 
+async def _stats_refresher():
+    """Refresh Neo4j memory gauges on a slow timer or on request"""
+    while True:
+        try:
+            if neo4j_client.driver:
+                stats = await neo4j_client.get_memory_stats()
+                metrics.set_gauge('memory_count', stats.get('memory_count', 0))
+                metrics.set_gauge('entity_count', stats.get('entity_count', 0))
+                metrics.set_gauge('custody_events_count', stats.get('custody_events', 0))
+        except Exception as e:
+            print(f"⚠️  Metrics collection error: {e}")
+        
+        await asyncio.sleep(STATS_MIN_INTERVAL_S)
+        try:
+            await asyncio.wait_for(_stats_refresh.wait(), STATS_REFRESH_INTERVAL_S - STATS_MIN_INTERVAL_S)
+        except asyncio.TimeoutError:
+            pass
+        _stats_refresh.clear()
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -474,10 +621,29 @@ if __name__ == "__main__":
     print(f"🔗 Architecture: Sovereign Memory + Graph Intelligence")
     print(f"🤖 Capabilities: Memory + RAG + Copilots + Audit + Ingestion + Self-Healing")
     
+    # uvloop (libuv) event loop where available; it has no Windows support
+    try:
+        import uvloop  # noqa: F401
+        event_loop = "uvloop" if sys.platform != "win32" else "asyncio"
+    except ImportError:
+        event_loop = "asyncio"
+    print(f"⚡ Event loop: {event_loop}")
+    
+    # scripts/run-api.sh preloads jemalloc/mimalloc when installed
+    preloaded = [lib for lib in os.getenv('LD_PRELOAD', '').split(':') if 'malloc' in lib]
+    allocator = os.path.basename(preloaded[0]) if preloaded else "system malloc"
+    print(f"🧮 Allocator: {allocator} (PYTHONMALLOC={os.getenv('PYTHONMALLOC', 'default')})")
+    
+    # Import string so uvicorn can spawn API_WORKERS processes. Each worker keeps
+    # its own in-memory audit trail, so the default stays at one worker.
+    # Per-request access logging is opt-in (API_ACCESS_LOG=true); metrics cover latency.
     uvicorn.run(
-        app, 
-        host="0.0.0.0", 
+        "api.server:app", 
+        host=os.getenv('UVICORN_HOST', '0.0.0.0'), 
         port=8080,
+        workers=int(os.getenv('API_WORKERS', '1')),
+        loop=event_loop,
+        http="auto",
         log_level="info",
-        access_log=True
+        access_log=os.getenv('API_ACCESS_LOG', 'false').lower() == 'true'
     )
\ No newline at end of file
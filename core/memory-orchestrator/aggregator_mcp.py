@@ -5,10 +5,11 @@ Unified memory operations across Mem0, SuperMemory, Neo4j
 """
 
 import asyncio
+import functools
 import json
 import sys
 from typing import Dict, List, Optional, Any
-from datetime import datetime
+from datetime import datetime, timezone
 
 # Import providers
 sys.path.append('../..')
@@ -16,50 +17,164 @@ from providers.mem0 import Mem0Provider
 from providers.supermemory import SuperMemoryProvider
 from graph.neo4j_client import Neo4jClient
 
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = functools.partial(orjson.dumps, default=str)
+except ImportError:  # Optional accelerator; stdlib json otherwise
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj, default=str).encode()
+
+# stdio server limits: longest accepted request line, requests awaiting a reply
+MCP_MAX_LINE_BYTES = 16 * 1024 * 1024
+MCP_MAX_IN_FLIGHT = 64
+
+# Neo4j write coalescing: a batch goes out after this window or at this many rows
+NEO4J_BATCH_WINDOW_S = 0.01
+NEO4J_BATCH_MAX = 128
+
+class _Neo4jBatcher:
+    """Coalesce concurrent memory-node writes into UNWIND batches
+    
+    Writes that arrive while a batch is open or in flight share one Neo4j
+    round-trip. Each caller still gets the single-node create_memory_node
+    result shape; latency rises by at most the batch window.
+    """
+    
+    def __init__(self, neo4j: Neo4jClient):
+        self.neo4j = neo4j
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._loop = None
+    
+    async def submit(self, content: str, entity: str, metadata: Dict = None) -> Dict:
+        """Queue one memory node and wait for its batch to be written"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._flusher.done():
+            # Bind to the running loop (scripts may call asyncio.run repeatedly)
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._flusher = loop.create_task(self._flush_forever())
+        
+        future = loop.create_future()
+        self._queue.put_nowait(({'content': content, 'entity': entity, 'metadata': metadata}, future))
+        return await future
+    
+    async def _flush_forever(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = self._loop.time() + NEO4J_BATCH_WINDOW_S
+            while len(batch) < NEO4J_BATCH_MAX:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+    
+    async def _write(self, batch: List):
+        try:
+            result = await self.neo4j.create_memory_nodes_batch([row for row, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        records = {record['idx']: record for record in result.get('records', [])}
+        for idx, (_, future) in enumerate(batch):
+            if future.done():
+                continue  # Caller was cancelled
+            if 'error' in result:
+                future.set_result({'error': result['error']})
+            else:
+                record = (
+                    {'memory_id': records[idx]['memory_id'], 'entity_name': records[idx]['entity_name']}
+                    if idx in records else None
+                )
+                future.set_result({
+                    'records': [record] if record else [],
+                    'count': 1 if record else 0,
+                    'query': result.get('query')
+                })
+
+@functools.lru_cache(maxsize=None)
+def _load_policy_file(path: str) -> Optional[Dict]:
+    """Parse a policy YAML once per process (None if unavailable)"""
+    try:
+        with open(path, 'r') as f:
+            import yaml
+            return yaml.safe_load(f)
+    except:
+        return None
+
 class MemoryAggregator:
     def __init__(self):
         self.mem0 = Mem0Provider()
         self.supermemory = SuperMemoryProvider()
         self.neo4j = Neo4jClient()
+        self._neo4j_batcher = _Neo4jBatcher(self.neo4j)
         self.policies = self._load_policies()
     
+    async def __aenter__(self) -> 'MemoryAggregator':
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+    
+    async def aclose(self):
+        """Close the Neo4j driver and the providers' shared HTTP pool"""
+        await asyncio.gather(self.neo4j.close(), self.mem0.aclose(), return_exceptions=True)
+    
     def _load_policies(self) -> Dict:
         """Load memory policies from config"""
-        try:
-            with open('policies/memory.yaml', 'r') as f:
-                import yaml
-                return yaml.safe_load(f)
-        except:
+        policies = _load_policy_file('policies/memory.yaml')
+        if policies is None:
             return {
                 'ttl_days': {'privileged': None, 'general': 365},
                 'tombstone': True,
                 'redaction': True
             }
+        return policies
     
-    async def write_memory(self, content: str, entity: str, classification: str = 'general', metadata: Dict = None) -> Dict:
-        """Write memory to all providers with sovereignty mirroring"""
-        timestamp = datetime.utcnow().isoformat()
-        full_metadata = {
+    @staticmethod
+    def _full_metadata(entity: str, classification: str, metadata: Dict = None) -> Dict:
+        """Metadata stored with a memory in every provider"""
+        now = datetime.now(timezone.utc)
+        return {
             'entity': entity,
             'classification': classification,
-            'timestamp': timestamp,
+            'timestamp': now.replace(tzinfo=None).isoformat(),
+            # Epoch seconds alongside the ISO string so TTL scans compare ints
+            'ts_epoch': int(now.timestamp()),
             'case_number': '1FDV-23-0001009',
             **(metadata or {})
         }
+    
+    @staticmethod
+    def _provider_result(outcome: Any) -> Any:
+        """Provider outcome, with an exception reported as an error dict"""
+        return {'error': str(outcome)} if isinstance(outcome, Exception) else outcome
+    
+    async def write_memory(self, content: str, entity: str, classification: str = 'general', metadata: Dict = None) -> Dict:
+        """Write memory to all providers with sovereignty mirroring"""
+        full_metadata = self._full_metadata(entity, classification, metadata)
         
-        results = {}
-        
-        # Primary: Write to Mem0 (system of record)
-        mem0_result = await self.mem0.write(content, entity, full_metadata)
-        results['mem0'] = mem0_result
-        
-        # Acceleration: Mirror to SuperMemory
-        supermemory_result = await self.supermemory.write(content, full_metadata)
-        results['supermemory'] = supermemory_result
+        # Mem0 (system of record), SuperMemory (acceleration mirror) and the
+        # Neo4j node (sovereignty) are independent, so write them concurrently
+        provider_writes = {
+            'mem0': self.mem0.write(content, entity, full_metadata),
+            'supermemory': self.supermemory.write(content, full_metadata),
+            'neo4j': self._neo4j_batcher.submit(content, entity, full_metadata),
+        }
+        outcomes = await asyncio.gather(*provider_writes.values(), return_exceptions=True)
         
-        # Sovereignty: Create graph node
-        neo4j_result = await self.neo4j.create_memory_node(content, entity, full_metadata)
-        results['neo4j'] = neo4j_result
+        results = {name: self._provider_result(outcome) for name, outcome in zip(provider_writes, outcomes)}
         
         return {
             'success': True,
@@ -67,26 +182,79 @@ class MemoryAggregator:
             'metadata': full_metadata
         }
     
+    async def write_memory_batch(self, items: List[Dict]) -> List[Any]:
+        """Write a batch of memories with one bulk call per provider
+        
+        Each item carries content, entity, classification and metadata. Mem0
+        and SuperMemory writes go through their bounded write_many; Neo4j
+        nodes coalesce into UNWIND batches. The result list is in item order
+        with write_memory's result shape; provider failures are reported per
+        item and provider.
+        """
+        metadatas = [
+            self._full_metadata(item['entity'], item.get('classification', 'general'), item.get('metadata'))
+            for item in items
+        ]
+        
+        mem0_results, supermemory_results, neo4j_results = await asyncio.gather(
+            self.mem0.write_many([
+                {'content': item['content'], 'entity': item['entity'], 'metadata': metadata}
+                for item, metadata in zip(items, metadatas)
+            ]),
+            self.supermemory.write_many([
+                {'content': item['content'], 'metadata': metadata}
+                for item, metadata in zip(items, metadatas)
+            ]),
+            asyncio.gather(*(
+                self._neo4j_batcher.submit(item['content'], item['entity'], metadata)
+                for item, metadata in zip(items, metadatas)
+            ), return_exceptions=True)
+        )
+        
+        return [
+            {
+                'success': True,
+                'providers': {
+                    'mem0': self._provider_result(mem0),
+                    'supermemory': self._provider_result(supermemory),
+                    'neo4j': self._provider_result(neo4j),
+                },
+                'metadata': metadata
+            }
+            for metadata, mem0, supermemory, neo4j in zip(metadatas, mem0_results, supermemory_results, neo4j_results)
+        ]
+    
     async def search_memory(self, query: str, entity: str = None, limit: int = 10, filters: Dict = None) -> List[Dict]:
         """Search across all providers with acceleration priority"""
-        results = []
+        # Query both providers at once; SuperMemory (acceleration) results rank
+        # first and Mem0 fills the remainder up to limit
+        supermemory_results, mem0_results = await asyncio.gather(
+            self.supermemory.search(query, limit, filters),
+            self.mem0.search(query, entity, limit, filters),
+            return_exceptions=True
+        )
         
-        # Fast path: SuperMemory acceleration
-        supermemory_results = await self.supermemory.search(query, limit, filters)
-        if supermemory_results:
-            results.extend([{**r, 'source': 'supermemory'} for r in supermemory_results])
-        
-        # Fallback: Mem0 comprehensive search
-        if len(results) < limit:
-            mem0_results = await self.mem0.search(query, entity, limit - len(results), filters)
-            results.extend([{**r, 'source': 'mem0'} for r in mem0_results])
+        results = []
+        if isinstance(supermemory_results, list):
+            results.extend([{**r, 'source': 'supermemory'} for r in supermemory_results[:limit]])
+        if isinstance(mem0_results, list):
+            results.extend([{**r, 'source': 'mem0'} for r in mem0_results[:limit - len(results)]])
         
         return results
 
 # MCP Server Implementation (stdio)
+_aggregator: Optional[MemoryAggregator] = None
+
+def _get_aggregator() -> MemoryAggregator:
+    """Aggregator shared by every MCP request (created on first use)"""
+    global _aggregator
+    if _aggregator is None:
+        _aggregator = MemoryAggregator()
+    return _aggregator
+
 async def handle_mcp_request(request: Dict) -> Dict:
     """Handle MCP requests"""
-    aggregator = MemoryAggregator()
+    aggregator = _get_aggregator()
     method = request.get('method')
     params = request.get('params', {})
     
@@ -111,17 +279,47 @@ async def handle_mcp_request(request: Dict) -> Dict:
     except Exception as e:
         return {'error': str(e)}
 
+async def _serve_line(line: bytes) -> bytes:
+    """Decode one stdio request line and encode its response"""
+    try:
+        response = await handle_mcp_request(_loads(line))
+    except Exception as e:
+        response = {'error': str(e)}
+    return _dumps(response) + b'\n'
+
+async def _stdin_readline():
+    """Async line reader over stdin (pipe transport, or a thread for plain files)"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=MCP_MAX_LINE_BYTES)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    except ValueError:  # stdin redirected from a regular file
+        return lambda: asyncio.to_thread(sys.stdin.buffer.readline)
+    return reader.readline
+
+async def _write_responses(pending: asyncio.Queue) -> None:
+    """Write responses in request order as each request task finishes"""
+    out = sys.stdout.buffer
+    while (task := await pending.get()) is not None:
+        out.write(await task)
+        out.flush()
+
+async def serve_stdio() -> None:
+    """MCP stdio server: one event loop, requests handled concurrently
+    
+    Each line becomes a task so slow provider calls overlap; responses are
+    still written in the order the requests arrived.
+    """
+    readline = await _stdin_readline()
+    pending: asyncio.Queue = asyncio.Queue(maxsize=MCP_MAX_IN_FLIGHT)
+    writer = asyncio.create_task(_write_responses(pending))
+    
+    while line := await readline():
+        if line.strip():
+            await pending.put(asyncio.create_task(_serve_line(line)))
+    
+    await pending.put(None)
+    await writer
+
 if __name__ == '__main__':
-    # MCP stdio server
-    while True:
-        try:
-            line = input()
-            request = json.loads(line)
-            response = asyncio.run(handle_mcp_request(request))
-            print(json.dumps(response))
-            sys.stdout.flush()
-        except EOFError:
-            break
-        except Exception as e:
-            print(json.dumps({'error': str(e)}))
-            sys.stdout.flush()
\ No newline at end of file
+    asyncio.run(serve_stdio())
@@ -7,9 +7,18 @@ Handles memory lifecycle and compliance policies
 import os
 import yaml
 import re
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 
+try:
+    import numpy as np
+except ImportError:  # Optional accelerator for large lifecycle scans
+    np = None
+
+# Below this many memories the plain Python loop beats building arrays
+TTL_VECTORIZE_MIN = 1000
+
 class PolicyEngine:
     def __init__(self, config_path: str = 'policies/memory.yaml'):
         self.config = self._load_config(config_path)
@@ -18,6 +27,29 @@ class PolicyEngine:
         self.redaction_policy = self.config.get('redaction_policy', {})
         self.access_control = self.config.get('access_control', {})
         
+        # Redaction patterns compiled once; apply_redaction runs per memory
+        self._redaction_patterns = [
+            (p['pattern'], re.compile(p['pattern'], re.IGNORECASE), p['replacement'])
+            for p in self.redaction_policy.get('patterns', [])
+        ]
+        # One alternation over every pattern: most content has nothing to
+        # redact, and a single search rules that out in one scan
+        self._redaction_probe = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern, _, _ in self._redaction_patterns), re.IGNORECASE
+        ) if self._redaction_patterns else None
+        
+        # TTLs in seconds (None = never expires), looked up per memory scanned
+        self._ttl_seconds = {
+            classification: (days * 86400 if days is not None else None)
+            for classification, days in self.ttl_policy.items()
+        }
+        self._redactable_classes = frozenset({'sensitive', 'general'})
+        # Vectorised TTL lookup: slot 0 (unknown classification) never expires
+        self._ttl_class_index = {classification: i + 1 for i, classification in enumerate(self._ttl_seconds)}
+        self._ttl_lut = np.array(
+            [float('inf')] + [float('inf') if ttl is None else float(ttl) for ttl in self._ttl_seconds.values()]
+        ) if np is not None else None
+        
     def _load_config(self, path: str) -> Dict:
         """Load policy configuration"""
         try:
@@ -36,18 +68,55 @@ class PolicyEngine:
             'access_control': {'general_access': True}
         }
     
-    def check_ttl_expired(self, memory: Dict) -> bool:
+    def check_ttl_expired(self, memory: Dict, now: Optional[float] = None) -> bool:
         """Check if memory has expired based on TTL policy"""
-        classification = memory.get('classification', 'general')
-        ttl_days = self.ttl_policy.get(classification)
+        ttl = self._ttl_seconds.get(memory.get('classification', 'general'))
         
-        if ttl_days is None:
+        if ttl is None:
             return False  # No expiration for privileged/evidence
         
+        return ((time.time() if now is None else now) - self._created_epoch(memory)) > ttl
+    
+    @staticmethod
+    def _created_epoch(memory: Dict) -> float:
+        """Creation time in epoch seconds, preferring the stored ts_epoch"""
+        ts_epoch = memory.get('ts_epoch')
+        if ts_epoch is not None:
+            return ts_epoch
+        
+        # Older memories only carry the ISO string; naive values are UTC
         created_at = datetime.fromisoformat(memory.get('timestamp', ''))
-        expiry_date = created_at + timedelta(days=ttl_days)
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at.timestamp()
+    
+    def _expired_flags(self, memories: List[Dict], now: float) -> List[bool]:
+        """TTL expiry per memory, vectorised with NumPy for large scans"""
+        ttl = self._ttl_seconds
+        created_epoch = self._created_epoch
+        
+        if np is None or len(memories) < TTL_VECTORIZE_MIN:
+            # One comprehension, no per-item method calls for memories that
+            # carry ts_epoch; only ISO-only memories go through the helper
+            return [
+                (ttl_seconds := ttl.get(m.get('classification', 'general'))) is not None
+                and now - (ts if (ts := m.get('ts_epoch')) is not None else created_epoch(m)) > ttl_seconds
+                for m in memories
+            ]
         
-        return datetime.utcnow() > expiry_date
+        count = len(memories)
+        class_index = self._ttl_class_index
+        classes = np.fromiter(
+            (class_index.get(m.get('classification', 'general'), 0) for m in memories), dtype=np.intp, count=count
+        )
+        ttls = self._ttl_lut[classes]
+        # Memories that never expire may carry no timestamp: only parse
+        # creation times where a TTL applies (NaN compares False otherwise)
+        created = np.fromiter(
+            (created_epoch(m) if expires else np.nan for m, expires in zip(memories, np.isfinite(ttls).tolist())),
+            dtype=np.float64, count=count
+        )
+        return ((now - created) > ttls).tolist()
     
     def create_tombstone(self, memory_id: str, reason: str, user: str = 'system') -> Dict:
         """Create tombstone record for deleted memory"""
@@ -73,19 +142,19 @@ class PolicyEngine:
         if not self.redaction_policy.get('enabled', True):
             return {'content': content, 'redacted': False}
         
+        if self._redaction_probe is None or not self._redaction_probe.search(content):
+            return {'content': content, 'redacted': False, 'redactions': []}
+        
         redacted_content = content
         redactions = []
         
-        for pattern_config in self.redaction_policy.get('patterns', []):
-            pattern = pattern_config['pattern']
-            replacement = pattern_config['replacement']
-            
-            matches = re.findall(pattern, redacted_content, re.IGNORECASE)
+        for pattern, compiled, replacement in self._redaction_patterns:
+            # subn substitutes and counts in a single scan
+            redacted_content, matches = compiled.subn(replacement, redacted_content)
             if matches:
-                redacted_content = re.sub(pattern, replacement, redacted_content, flags=re.IGNORECASE)
                 redactions.append({
                     'pattern': pattern,
-                    'matches': len(matches),
+                    'matches': matches,
                     'replacement': replacement
                 })
         
@@ -112,10 +181,12 @@ class PolicyEngine:
     async def apply_lifecycle_policies(self, memories: List[Dict]) -> List[Dict]:
         """Apply TTL and lifecycle policies to memory list"""
         active_memories = []
+        append = active_memories.append
         expired_count = 0
+        redactable = self._redactable_classes
         
-        for memory in memories:
-            if self.check_ttl_expired(memory):
+        for memory, expired in zip(memories, self._expired_flags(memories, time.time())):
+            if expired:
                 # Auto-expire with tombstone
                 tombstone = self.create_tombstone(
                     memory.get('id', ''),
@@ -123,14 +194,20 @@ class PolicyEngine:
                     'policy_engine'
                 )
                 expired_count += 1
-            else:
-                # Apply redaction if needed
-                if memory.get('classification') in ['sensitive', 'general']:
-                    redacted = self.apply_redaction(memory.get('content', ''))
+                continue
+            
+            # Apply redaction if needed; empty content has nothing to redact
+            if memory.get('classification') in redactable:
+                content = memory.get('content')
+                if content:
+                    redacted = self.apply_redaction(content)
                     memory['content'] = redacted['content']
                     memory['redacted'] = redacted['redacted']
-                
-                active_memories.append(memory)
+                else:
+                    memory['content'] = content or ''
+                    memory['redacted'] = False
+            
+            append(memory)
         
         return {
             'active_memories': active_memories,
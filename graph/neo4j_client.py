@@ -5,12 +5,109 @@ Fixed async implementation and import paths
 """
 
 import os
-from neo4j import GraphDatabase
-from typing import Dict, List, Optional, Any
+import re
+from neo4j import AsyncGraphDatabase, GraphDatabase, READ_ACCESS, WRITE_ACCESS
+from typing import AsyncIterator, Dict, List, Optional, Any
 from datetime import datetime
 import json
 import asyncio
 
+try:
+    import orjson
+except ImportError:  # Optional accelerator; stdlib json otherwise
+    orjson = None
+
+# Query texts are module constants: Neo4j caches plans by query text, so
+# every call with the same statement reuses one plan
+_CYPHER_CREATE_MEMORY = """
+CREATE (m:Memory {
+    id: randomUUID(),
+    content: $content,
+    entity: $entity,
+    created_at: datetime(),
+    metadata: $metadata
+})
+WITH m
+MERGE (e:Entity {name: $entity})
+CREATE (m)-[:RELATES_TO]->(e)
+RETURN m.id as memory_id, e.name as entity_name
+"""
+_CYPHER_CREATE_MEMORIES = """
+UNWIND $rows AS r
+CREATE (m:Memory {
+    id: randomUUID(),
+    content: r.content,
+    entity: r.entity,
+    created_at: datetime(),
+    metadata: r.metadata
+})
+WITH m, r
+MERGE (e:Entity {name: r.entity})
+CREATE (m)-[:RELATES_TO]->(e)
+RETURN r.idx as idx, m.id as memory_id, e.name as entity_name
+"""
+# Search goes through the memory_fts full-text index instead of a CONTAINS
+# scan, and projects the four fields callers use rather than whole nodes
+_CYPHER_SEARCH_ENTITY = """
+CALL db.index.fulltext.queryNodes('memory_fts', $query) YIELD node AS m, score
+MATCH (m)-[:RELATES_TO]->(e:Entity {name: $entity})
+RETURN m.id AS id, m.content AS content, m.created_at AS created_at, e.name AS entity
+ORDER BY score DESC
+LIMIT $limit
+"""
+_CYPHER_SEARCH = """
+CALL db.index.fulltext.queryNodes('memory_fts', $query) YIELD node AS m, score
+OPTIONAL MATCH (m)-[:RELATES_TO]->(e:Entity)
+RETURN m.id AS id, m.content AS content, m.created_at AS created_at, e.name AS entity
+ORDER BY score DESC
+LIMIT $limit
+"""
+# Three label counts in one round-trip; each subquery is a count-store
+# lookup, where chained OPTIONAL MATCHes built the full cross product
+_CYPHER_MEMORY_STATS = """
+CALL { MATCH (m:Memory) RETURN count(m) AS memory_count }
+CALL { MATCH (e:Entity) RETURN count(e) AS entity_count }
+CALL { MATCH (c:CustodyEvent) RETURN count(c) AS custody_events }
+RETURN memory_count, entity_count, custody_events
+"""
+_CYPHER_CHAIN_OF_CUSTODY = """
+MATCH (e:Evidence {id: $evidence_id})
+CREATE (c:CustodyEvent {
+    id: randomUUID(),
+    handler: $handler,
+    action: $action,
+    timestamp: datetime()
+})
+CREATE (e)-[:CUSTODY_EVENT]->(c)
+RETURN c.id as custody_id
+"""
+
+# One statement for every traversal: apoc.path.expand takes the relationship
+# filter and depth as parameters, so all of them share a single cached plan
+_CYPHER_TRAVERSE = """
+MATCH (start:Entity {name: $start_entity})
+CALL apoc.path.expand(start, $rel, null, 1, $depth) YIELD path
+RETURN path, nodes(path) as nodes, relationships(path) as rels
+LIMIT 100
+"""
+_RELATIONSHIP_TYPE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_MAX_TRAVERSE_DEPTH = 10
+
+# Lucene query syntax characters; escaped so the raw query text is matched
+# literally instead of being parsed as operators
+_LUCENE_SPECIAL = {c: '\\' + c for c in '+-&|!(){}[]^"~*?:\\/'}
+_LUCENE_ESCAPE = str.maketrans(_LUCENE_SPECIAL)
+
+def escape_fulltext(text: str) -> str:
+    """Escape text for db.index.fulltext.queryNodes"""
+    return text.translate(_LUCENE_ESCAPE)
+
+def _metadata_json(metadata: Optional[Dict]) -> str:
+    """Memory metadata as the JSON string stored on the node"""
+    if orjson is None:
+        return json.dumps(metadata or {})
+    return orjson.dumps(metadata or {}).decode()
+
 class Neo4jClient:
     def __init__(self, uri: str = None, user: str = None, password: str = None):
         self.uri = uri or os.getenv('NEO4J_URI', 'bolt://localhost:7687')
@@ -18,146 +115,194 @@ class Neo4jClient:
         self.password = password or os.getenv('NEO4J_PASSWORD', 'password')
         
         try:
-            self.driver = GraphDatabase.driver(
-                self.uri, 
-                auth=(self.user, self.password)
+            # One-off synchronous probe: __init__ may run outside any event loop.
+            # Short connect timeout so an unreachable server doesn't stall startup.
+            with GraphDatabase.driver(
+                self.uri,
+                auth=(self.user, self.password),
+                connection_timeout=float(os.getenv('NEO4J_CONNECT_TIMEOUT', '5'))
+            ) as probe:
+                probe.verify_connectivity()
+                # Full-text index backing graph search (db.index.fulltext.queryNodes)
+                probe.execute_query(
+                    "CREATE FULLTEXT INDEX memory_fts IF NOT EXISTS "
+                    "FOR (m:Memory) ON EACH [m.content]"
+                )
+            
+            # Queries share one pooled async driver; each call borrows a
+            # short-lived session, so no thread-pool hop per query
+            self.driver = AsyncGraphDatabase.driver(
+                self.uri,
+                auth=(self.user, self.password),
+                max_connection_pool_size=int(os.getenv('NEO4J_MAX_CONNECTION_POOL_SIZE', '100')),
+                connection_acquisition_timeout=float(os.getenv('NEO4J_CONNECTION_ACQUISITION_TIMEOUT', '30')),
+                max_connection_lifetime=int(os.getenv('NEO4J_MAX_CONNECTION_LIFETIME', '3600'))
             )
-            # Test connection
-            with self.driver.session() as session:
-                session.run("RETURN 1")
+            # Shared by every session: reads routed to replicas still see
+            # this client's earlier writes (causal consistency)
+            self._bookmarks = AsyncGraphDatabase.bookmark_manager()
             print(f"✅ Neo4j connected: {self.uri}")
         except Exception as e:
             print(f"❌ Neo4j connection failed: {e}")
             self.driver = None
     
-    async def cypher(self, query: str, params: Dict = None) -> Dict:
-        """Execute Cypher query (async wrapper)"""
+    def _session(self, read: bool):
+        """Short-lived session on the pooled driver
+        
+        Sessions are cheap wrappers over pooled connections (the pool is what
+        saves the Bolt handshake) and aren't safe to share between concurrent
+        tasks, so each call opens its own. read=True lets a cluster route the
+        query to a read replica.
+        """
+        return self.driver.session(
+            default_access_mode=READ_ACCESS if read else WRITE_ACCESS,
+            bookmark_manager=self._bookmarks
+        )
+    
+    async def warm_up(self):
+        """Open a pooled connection on the running loop before the first query"""
+        if self.driver:
+            try:
+                await self.driver.verify_connectivity()
+            except Exception as e:
+                print(f"⚠️ Neo4j warm-up failed: {e}")
+    
+    async def cypher(self, query: str, params: Dict = None, read: bool = False) -> Dict:
+        """Execute Cypher query on a pooled async session"""
         if not self.driver:
             return {'error': 'No Neo4j connection'}
         
         try:
-            # Run in thread pool to make async
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, self._execute_cypher, query, params)
-            return result
-        except Exception as e:
-            print(f"❌ Cypher execution failed: {e}")
-            return {'error': str(e)}
-    
-    def _execute_cypher(self, query: str, params: Dict = None) -> Dict:
-        """Synchronous Cypher execution"""
-        with self.driver.session() as session:
-            result = session.run(query, params or {})
-            records = [record.data() for record in result]
+            async with self._session(read) as session:
+                result = await session.run(query, params or {})
+                records = [record.data() async for record in result]
             
             return {
                 'records': records,
                 'count': len(records),
                 'query': query
             }
+        except Exception as e:
+            print(f"❌ Cypher execution failed: {e}")
+            return {'error': str(e)}
+    
+    async def cypher_stream(self, query: str, params: Dict = None, read: bool = False) -> AsyncIterator[Dict]:
+        """Yield records one at a time instead of collecting them
+        
+        The session stays open while the caller iterates, so large results
+        (long traversal paths, wide searches) are never held in memory whole.
+        Yields nothing when there is no connection.
+        """
+        if not self.driver:
+            return
+        
+        async with self._session(read) as session:
+            result = await session.run(query, params or {})
+            async for record in result:
+                yield record.data()
+    
+    async def cypher_single(self, query: str, params: Dict = None, read: bool = False) -> Dict:
+        """Execute a one-row query; the row's data, or {} on no row or error"""
+        if not self.driver:
+            return {}
+        
+        try:
+            async with self._session(read) as session:
+                result = await session.run(query, params or {})
+                record = await result.single()
+                # Release the server-side cursor now rather than at session close
+                await result.consume()
+            return record.data() if record else {}
+        except Exception as e:
+            print(f"❌ Cypher execution failed: {e}")
+            return {}
     
     async def create_memory_node(self, content: str, entity: str, metadata: Dict = None) -> Dict:
         """Create memory node with relationships"""
-        query = """
-        CREATE (m:Memory {
-            id: randomUUID(),
-            content: $content,
-            entity: $entity,
-            created_at: datetime(),
-            metadata: $metadata
-        })
-        WITH m
-        MERGE (e:Entity {name: $entity})
-        CREATE (m)-[:RELATES_TO]->(e)
-        RETURN m.id as memory_id, e.name as entity_name
+        return await self.create_memory_node_fast(content, entity, _metadata_json(metadata))
+    
+    async def create_memory_node_fast(self, content: str, entity: str, metadata_json: str) -> Dict:
+        """create_memory_node with metadata already encoded as a JSON object string
+        
+        For callers holding metadata as JSON (e.g. from an upload) that would
+        otherwise decode it only for it to be encoded again here.
         """
+        return await self.cypher(
+            _CYPHER_CREATE_MEMORY, {'content': content, 'entity': entity, 'metadata': metadata_json}
+        )
+    
+    async def create_memory_nodes_batch(self, rows: List[Dict]) -> Dict:
+        """Create many memory nodes in one UNWIND round-trip
         
-        params = {
-            'content': content,
-            'entity': entity,
-            'metadata': json.dumps(metadata or {})
-        }
+        Each row carries content, entity and metadata, or metadata_json to
+        skip encoding. Records come back with the row's position as idx, since
+        UNWIND output order isn't guaranteed.
+        """
+        params = {'rows': [
+            {
+                'idx': idx,
+                'content': row['content'],
+                'entity': row['entity'],
+                'metadata': row['metadata_json'] if 'metadata_json' in row else _metadata_json(row.get('metadata'))
+            }
+            for idx, row in enumerate(rows)
+        ]}
         
-        return await self.cypher(query, params)
+        return await self.cypher(_CYPHER_CREATE_MEMORIES, params)
     
     async def search_memories(self, query: str, entity: str = None, limit: int = 10) -> List[Dict]:
         """Search memories using full-text and graph traversal"""
+        params = {'query': escape_fulltext(query), 'limit': limit}
         if entity:
-            cypher = """
-            MATCH (m:Memory)-[:RELATES_TO]->(e:Entity {name: $entity})
-            WHERE m.content CONTAINS $query
-            RETURN m, e
-            ORDER BY m.created_at DESC
-            LIMIT $limit
-            """
-            params = {'query': query, 'entity': entity, 'limit': limit}
+            cypher = _CYPHER_SEARCH_ENTITY
+            params['entity'] = entity
         else:
-            cypher = """
-            MATCH (m:Memory)
-            WHERE m.content CONTAINS $query
-            OPTIONAL MATCH (m)-[:RELATES_TO]->(e:Entity)
-            RETURN m, e
-            ORDER BY m.created_at DESC
-            LIMIT $limit
-            """
-            params = {'query': query, 'limit': limit}
+            cypher = _CYPHER_SEARCH
         
-        result = await self.cypher(cypher, params)
+        result = await self.cypher(cypher, params, read=True)
         return result.get('records', [])
     
+    async def search_memories_stream(self, query: str, entity: str = None,
+                                     limit: int = 10) -> AsyncIterator[Dict]:
+        """search_memories, yielding records as the server sends them"""
+        params = {'query': escape_fulltext(query), 'limit': limit}
+        if entity:
+            params['entity'] = entity
+        
+        async for record in self.cypher_stream(_CYPHER_SEARCH_ENTITY if entity else _CYPHER_SEARCH, params, read=True):
+            yield record
+    
     async def get_memory_stats(self) -> Dict:
         """Get memory graph statistics"""
-        query = """
-        MATCH (m:Memory)
-        OPTIONAL MATCH (e:Entity)
-        OPTIONAL MATCH (c:CustodyEvent)
-        RETURN 
-            count(DISTINCT m) as memory_count,
-            count(DISTINCT e) as entity_count,
-            count(DISTINCT c) as custody_events
-        """
-        
-        result = await self.cypher(query)
-        return result.get('records', [{}])[0] if result.get('records') else {}
+        return await self.cypher_single(_CYPHER_MEMORY_STATS, read=True)
     
     async def traverse_graph(self, start_entity: str, relationship: str, depth: int = 3) -> Dict:
         """Traverse memory graph for provenance"""
-        query = f"""
-        MATCH path = (start:Entity {{name: $start_entity}})
-                    -[:{relationship}*1..{depth}]->(end)
-        RETURN path, nodes(path) as nodes, relationships(path) as rels
-        LIMIT 100
-        """
+        if not _RELATIONSHIP_TYPE.fullmatch(relationship):
+            return {'error': f'Invalid relationship type: {relationship!r}'}
         
-        params = {'start_entity': start_entity}
-        return await self.cypher(query, params)
+        params = {
+            'start_entity': start_entity,
+            # Trailing '>' keeps the expansion outgoing-only, as before
+            'rel': f'{relationship}>',
+            'depth': min(max(int(depth), 1), _MAX_TRAVERSE_DEPTH)
+        }
+        return await self.cypher(_CYPHER_TRAVERSE, params, read=True)
     
     async def create_chain_of_custody(self, evidence_id: str, handler: str, action: str) -> Dict:
         """Create chain of custody relationship"""
-        query = """
-        MATCH (e:Evidence {id: $evidence_id})
-        CREATE (c:CustodyEvent {
-            id: randomUUID(),
-            handler: $handler,
-            action: $action,
-            timestamp: datetime()
-        })
-        CREATE (e)-[:CUSTODY_EVENT]->(c)
-        RETURN c.id as custody_id
-        """
-        
         params = {
             'evidence_id': evidence_id,
             'handler': handler,
             'action': action
         }
         
-        return await self.cypher(query, params)
+        return await self.cypher(_CYPHER_CHAIN_OF_CUSTODY, params)
     
-    def close(self):
+    async def close(self):
         """Close Neo4j connection"""
         if self.driver:
-            self.driver.close()
+            await self.driver.close()
 
 if __name__ == '__main__':
     # Test Neo4j operations
@@ -174,7 +319,7 @@ if __name__ == '__main__':
             stats = await client.get_memory_stats()
             print(f"Memory stats: {stats}")
             
-            client.close()
+            await client.close()
         else:
             print("❌ Neo4j not connected - check configuration")
     
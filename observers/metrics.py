@@ -4,28 +4,133 @@ Metrics and Observability
 Prometheus exporters, SLO monitoring, and self-healing triggers
 """
 
+import io
 import time
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime, timedelta, timezone
 from collections import defaultdict, deque
 import asyncio
 
+try:
+    import numpy as np
+except ImportError:  # Optional accelerator; sorted() over a deque otherwise
+    np = None
+
+_tick_second: Optional[int] = None
+_tick_iso = ''
+
+def _now_iso() -> str:
+    """Naive UTC ISO timestamp, formatted once per wall-clock second
+    
+    Remediation records and dashboards don't need sub-second precision, so a
+    burst of violations within one second shares a single formatted string.
+    """
+    global _tick_second, _tick_iso
+    second = int(time.time())
+    if second != _tick_second:
+        _tick_iso = datetime.fromtimestamp(second, timezone.utc).replace(tzinfo=None).isoformat()
+        _tick_second = second
+    return _tick_iso
+
+HISTOGRAM_WINDOW = 1000  # Latency samples kept per histogram
+# Quantiles the Prometheus export reports; computed together on any cache miss
+EXPORT_QUANTILES = (50.0, 95.0, 99.0)
+
+class _LatencyWindow:
+    """Most recent latency samples, as a NumPy ring buffer when available
+    
+    Quantiles use the nearest-rank index int(n * pct / 100) as before, but
+    one np.partition call (introselect) serves every requested rank instead
+    of a full sort per percentile. Results are memoised until the next
+    sample, so repeated SLO reads between requests cost a dict lookup. A
+    miss also fills the export quantiles, so an SLO p95 check and the next
+    /metrics scrape share one partition pass.
+    """
+    __slots__ = ('_buffer', '_next', '_count', '_size', '_quantile_cache')
+    
+    def __init__(self, size: int = HISTOGRAM_WINDOW):
+        self._size = size
+        self._next = 0
+        self._count = 0
+        self._buffer = np.empty(size) if np is not None else deque(maxlen=size)
+        self._quantile_cache: Dict[float, float] = {}
+    
+    def append(self, value: float):
+        if self._quantile_cache:
+            self._quantile_cache = {}
+        if np is None:
+            self._buffer.append(value)
+            return
+        self._buffer[self._next] = value
+        self._next = (self._next + 1) % self._size
+        if self._count < self._size:
+            self._count += 1
+    
+    def __len__(self) -> int:
+        return self._count if np is not None else len(self._buffer)
+    
+    def quantiles(self, percentiles) -> List[float]:
+        """Values at each percentile (0-100); zeros when empty"""
+        cache = self._quantile_cache
+        missing = [pct for pct in percentiles if pct not in cache]
+        if missing:
+            count = len(self)
+            if not count:
+                return [0.0] * len(percentiles)
+            missing.extend(pct for pct in EXPORT_QUANTILES if pct not in cache and pct not in missing)
+            ranks = [min(int(count * pct / 100.0), count - 1) for pct in missing]
+            if np is None:
+                values = sorted(self._buffer)
+                cache.update(zip(missing, (values[rank] for rank in ranks)))
+            else:
+                partitioned = np.partition(self._buffer[:count], ranks)
+                cache.update(zip(missing, (float(partitioned[rank]) for rank in ranks)))
+        return [cache[pct] for pct in percentiles]
+
+# SLO kind -> (runbook, threshold multiple above which a violation is 'high';
+# None means always 'medium')
+_SLO_RESPONSES = {
+    'latency_p95': ('high_latency', 2),
+    'error_rate': ('high_error_rate', 1),
+    'queue_depth': ('queue_backlog', None)
+}
+
 class MetricsCollector:
     def __init__(self):
-        # Time-series metrics storage (in-memory for now)
-        self.metrics = defaultdict(deque)  # metric_name -> deque of (timestamp, value)
+        # Keep only last 1000 data points per metric
+        self.max_data_points = 1000
+        
+        # Gauge time series (in-memory for now), metric_name -> deque of
+        # (timestamp, value); bounded deques drop the oldest point on append
+        self.metrics = defaultdict(lambda: deque(maxlen=self.max_data_points))
         self.counters = defaultdict(int)   # metric_name -> count
         self.gauges = defaultdict(float)   # metric_name -> current_value
-        self.histograms = defaultdict(list) # metric_name -> list of values
+        self.histograms = defaultdict(_LatencyWindow)  # metric_name -> recent values
         
-        # SLO definitions
+        # Prometheus text per (metric_name, type): the '# TYPE' header and
+        # sample names, built on first export and reused by every scrape
+        self._type_headers: Dict[tuple, str] = {}
+        
+        # SLO definitions; 'kind' selects the evaluator in self._evaluators
         self.slos = {
-            'memory_write_latency_p95': {'threshold': 100, 'unit': 'ms'},  # 95th percentile < 100ms
-            'memory_search_latency_p95': {'threshold': 50, 'unit': 'ms'},   # 95th percentile < 50ms
-            'graph_query_latency_p95': {'threshold': 200, 'unit': 'ms'},    # 95th percentile < 200ms
-            'api_error_rate': {'threshold': 0.01, 'unit': 'ratio'},         # Error rate < 1%
-            'ingestion_queue_depth': {'threshold': 100, 'unit': 'count'},   # Queue depth < 100
-            'memory_system_uptime': {'threshold': 0.999, 'unit': 'ratio'}   # 99.9% uptime
+            'memory_write_latency_p95': {'threshold': 100, 'unit': 'ms', 'kind': 'latency_p95',
+                                         'base': 'memory_write_latency'},     # 95th percentile < 100ms
+            'memory_search_latency_p95': {'threshold': 50, 'unit': 'ms', 'kind': 'latency_p95',
+                                          'base': 'memory_search_latency'},   # 95th percentile < 50ms
+            'graph_query_latency_p95': {'threshold': 200, 'unit': 'ms', 'kind': 'latency_p95',
+                                        'base': 'graph_query_latency'},       # 95th percentile < 200ms
+            'api_error_rate': {'threshold': 0.01, 'unit': 'ratio', 'kind': 'error_rate'},        # Error rate < 1%
+            'ingestion_queue_depth': {'threshold': 100, 'unit': 'count', 'kind': 'queue_depth',
+                                      'gauge': 'ingestion_queue_depth'},      # Queue depth < 100
+            'memory_system_uptime': {'threshold': 0.999, 'unit': 'ratio', 'kind': 'uptime'}      # 99.9% uptime
+        }
+        
+        # SLO kind -> current value from (slo_config, snapshot); kinds without
+        # an evaluator (uptime) aren't measured yet
+        self._evaluators = {
+            'latency_p95': self._eval_p95,
+            'error_rate': self._eval_error_rate,
+            'queue_depth': self._eval_queue_depth
         }
         
         # Auto-remediation runbooks
@@ -35,101 +140,78 @@ class MetricsCollector:
             'queue_backlog': self._remediate_queue_backlog,
             'service_down': self._remediate_service_down
         }
-        
-        # Keep only last 1000 data points per metric
-        self.max_data_points = 1000
     
     def record_latency(self, metric_name: str, latency_ms: float):
         """Record latency measurement"""
-        timestamp = time.time()
-        self.metrics[metric_name].append((timestamp, latency_ms))
+        # Samples live only in the fixed-size histogram window, which is what
+        # percentiles and the Prometheus export read
         self.histograms[f"{metric_name}_histogram"].append(latency_ms)
-        
-        # Trim old data
-        if len(self.metrics[metric_name]) > self.max_data_points:
-            self.metrics[metric_name].popleft()
-        
-        # Keep only recent histogram data
-        if len(self.histograms[f"{metric_name}_histogram"]) > 1000:
-            self.histograms[f"{metric_name}_histogram"] = self.histograms[f"{metric_name}_histogram"][-1000:]
     
     def increment_counter(self, metric_name: str, value: int = 1):
         """Increment counter metric"""
+        # No per-increment history: Prometheus derives rates from scrapes
         self.counters[metric_name] += value
-        timestamp = time.time()
-        self.metrics[f"{metric_name}_total"].append((timestamp, self.counters[metric_name]))
     
     def set_gauge(self, metric_name: str, value: float):
         """Set gauge metric value"""
         self.gauges[metric_name] = value
-        timestamp = time.time()
-        self.metrics[metric_name].append((timestamp, value))
-        
-        # Trim old data
-        if len(self.metrics[metric_name]) > self.max_data_points:
-            self.metrics[metric_name].popleft()
+        self.metrics[metric_name].append((time.time(), value))
     
     def calculate_percentile(self, metric_name: str, percentile: float) -> float:
         """Calculate percentile for histogram metric"""
-        histogram_key = f"{metric_name}_histogram"
-        if histogram_key not in self.histograms or not self.histograms[histogram_key]:
-            return 0.0
-        
-        values = sorted(self.histograms[histogram_key])
-        if not values:
+        histogram = self.histograms.get(f"{metric_name}_histogram")
+        if not histogram:
             return 0.0
         
-        index = int(len(values) * percentile / 100.0)
-        return values[min(index, len(values) - 1)]
+        return histogram.quantiles((percentile,))[0]
     
-    def check_slo_violations(self) -> List[Dict]:
+    def snapshot(self) -> Dict[str, tuple]:
+        """(p50, p95, p99) per latency metric, read once for a whole report"""
+        return {
+            metric_name[:-len('_histogram')]: tuple(histogram.quantiles(EXPORT_QUANTILES))
+            for metric_name, histogram in list(self.histograms.items())
+            if histogram
+        }
+    
+    def _eval_p95(self, slo_config: Dict, snapshot: Dict[str, tuple]) -> float:
+        return snapshot.get(slo_config['base'], (0.0, 0.0, 0.0))[1]
+    
+    def _eval_error_rate(self, slo_config: Dict, snapshot: Dict[str, tuple]) -> float:
+        return self.counters.get('api_errors_total', 0) / self.counters.get('api_requests_total', 1)
+    
+    def _eval_queue_depth(self, slo_config: Dict, snapshot: Dict[str, tuple]) -> float:
+        return self.gauges.get(slo_config['gauge'], 0)
+    
+    def _evaluate_slos(self, snapshot: Dict[str, tuple]) -> Dict[str, float]:
+        """Current value of every measurable SLO"""
+        evaluators = self._evaluators
+        return {
+            slo_name: evaluators[slo_config['kind']](slo_config, snapshot)
+            for slo_name, slo_config in self.slos.items()
+            if slo_config['kind'] in evaluators
+        }
+    
+    def check_slo_violations(self, snapshot: Optional[Dict[str, tuple]] = None,
+                             values: Optional[Dict[str, float]] = None) -> List[Dict]:
         """Check for SLO violations and trigger remediation"""
+        if values is None:
+            values = self._evaluate_slos(self.snapshot() if snapshot is None else snapshot)
         violations = []
         
-        for slo_name, slo_config in self.slos.items():
+        for slo_name, current_value in values.items():
+            slo_config = self.slos[slo_name]
             threshold = slo_config['threshold']
+            if current_value <= threshold:
+                continue
             
-            if 'latency_p95' in slo_name:
-                # Check 95th percentile latency
-                base_metric = slo_name.replace('_p95', '')
-                current_p95 = self.calculate_percentile(base_metric, 95.0)
-                
-                if current_p95 > threshold:
-                    violations.append({
-                        'slo': slo_name,
-                        'current_value': current_p95,
-                        'threshold': threshold,
-                        'severity': 'high' if current_p95 > threshold * 2 else 'medium',
-                        'remediation': 'high_latency'
-                    })
-            
-            elif 'error_rate' in slo_name:
-                # Check error rate
-                total_requests = self.counters.get('api_requests_total', 1)
-                total_errors = self.counters.get('api_errors_total', 0)
-                error_rate = total_errors / total_requests
-                
-                if error_rate > threshold:
-                    violations.append({
-                        'slo': slo_name,
-                        'current_value': error_rate,
-                        'threshold': threshold,
-                        'severity': 'high',
-                        'remediation': 'high_error_rate'
-                    })
-            
-            elif 'queue_depth' in slo_name:
-                # Check ingestion queue depth
-                current_depth = self.gauges.get('ingestion_queue_depth', 0)
-                
-                if current_depth > threshold:
-                    violations.append({
-                        'slo': slo_name,
-                        'current_value': current_depth,
-                        'threshold': threshold,
-                        'severity': 'medium',
-                        'remediation': 'queue_backlog'
-                    })
+            remediation, high_above = _SLO_RESPONSES[slo_config['kind']]
+            violations.append({
+                'slo': slo_name,
+                'current_value': current_value,
+                'threshold': threshold,
+                'severity': 'high' if high_above is not None and current_value > threshold * high_above else 'medium',
+                'remediation': remediation
+            })
         
         return violations
     
@@ -155,7 +237,7 @@ class MetricsCollector:
         return {
             'remediation_type': 'high_latency',
             'actions_taken': remediation_log,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': _now_iso()
         }
     
     async def _remediate_high_error_rate(self, violation: Dict):
@@ -165,7 +247,7 @@ class MetricsCollector:
         return {
             'remediation_type': 'high_error_rate',
             'actions_taken': ['Enabled circuit breaker', 'Increased retry intervals'],
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': _now_iso()
         }
     
     async def _remediate_queue_backlog(self, violation: Dict):
@@ -175,7 +257,7 @@ class MetricsCollector:
         return {
             'remediation_type': 'queue_backlog',
             'actions_taken': ['Scaled ingestion workers', 'Prioritized critical items'],
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': _now_iso()
         }
     
     async def _remediate_service_down(self, violation: Dict):
@@ -185,54 +267,81 @@ class MetricsCollector:
         return {
             'remediation_type': 'service_down',
             'actions_taken': ['Attempted service restart', 'Enabled backup endpoints'],
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': _now_iso()
         }
     
-    def get_prometheus_metrics(self) -> str:
-        """Export metrics in Prometheus format"""
-        lines = []
+    def _type_header(self, metric_name: str, metric_type: str) -> str:
+        """Cached exposition text for one metric, up to its value(s)
+        
+        Counters and gauges get '# TYPE n t\nn ' (value appended); histograms
+        get a %-template with one slot per exported quantile.
+        """
+        key = (metric_name, metric_type)
+        header = self._type_headers.get(key)
+        if header is None:
+            if metric_type == 'histogram':
+                name = metric_name.replace('%', '%%')
+                header = f"# TYPE {name} histogram\n" + "".join(
+                    f"{name}{{quantile=\"{pct / 100}\"}} %s\n" for pct in EXPORT_QUANTILES
+                )
+            else:
+                header = f"# TYPE {metric_name} {metric_type}\n{metric_name} "
+            self._type_headers[key] = header
+        return header
+    
+    def _prometheus_blocks(self, snapshot: Optional[Dict[str, tuple]] = None) -> Iterator[str]:
+        """Newline-terminated exposition text per metric, from registry snapshots"""
+        header = self._type_header
         
         # Counters
-        for metric_name, value in self.counters.items():
-            lines.append(f"# TYPE {metric_name} counter")
-            lines.append(f"{metric_name} {value}")
+        for metric_name, value in list(self.counters.items()):
+            yield f"{header(metric_name, 'counter')}{value}\n"
         
         # Gauges
-        for metric_name, value in self.gauges.items():
-            lines.append(f"# TYPE {metric_name} gauge")
-            lines.append(f"{metric_name} {value}")
+        for metric_name, value in list(self.gauges.items()):
+            yield f"{header(metric_name, 'gauge')}{value}\n"
         
-        # Histograms (simplified)
-        for metric_name, values in self.histograms.items():
-            if values:
-                p50 = self.calculate_percentile(metric_name.replace('_histogram', ''), 50.0)
-                p95 = self.calculate_percentile(metric_name.replace('_histogram', ''), 95.0)
-                p99 = self.calculate_percentile(metric_name.replace('_histogram', ''), 99.0)
-                
-                base_name = metric_name.replace('_histogram', '')
-                lines.append(f"# TYPE {base_name} histogram")
-                lines.append(f"{base_name}{{quantile=\"0.5\"}} {p50}")
-                lines.append(f"{base_name}{{quantile=\"0.95\"}} {p95}")
-                lines.append(f"{base_name}{{quantile=\"0.99\"}} {p99}")
-        
-        return "\n".join(lines)
+        # Histograms (simplified); all three quantiles from the snapshot
+        if snapshot is None:
+            snapshot = self.snapshot()
+        for base_name, quantiles in snapshot.items():
+            yield header(base_name, 'histogram') % quantiles
+    
+    def iter_prometheus_lines(self, chunk_chars: int = 8192,
+                              snapshot: Optional[Dict[str, tuple]] = None) -> Iterator[bytes]:
+        """Prometheus exposition as encoded chunks of about chunk_chars characters"""
+        buf = io.StringIO()
+        write = buf.write
+        for block in self._prometheus_blocks(snapshot):
+            write(block)
+            if buf.tell() >= chunk_chars:
+                yield buf.getvalue().encode()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode()
     
-    def get_slo_dashboard(self) -> Dict:
+    def get_prometheus_metrics(self) -> str:
+        """Export metrics in Prometheus format"""
+        return "".join(self._prometheus_blocks()).rstrip("\n")
+    
+    def get_slo_dashboard(self, snapshot: Optional[Dict[str, tuple]] = None) -> Dict:
         """Get SLO dashboard data"""
         dashboard = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': _now_iso(),
             'slos': {},
             'overall_health': 'GREEN'
         }
         
-        violations = self.check_slo_violations()
+        # One evaluation serves both the violation check and the SLO table
+        values = self._evaluate_slos(self.snapshot() if snapshot is None else snapshot)
+        violations = self.check_slo_violations(values=values)
         
         for slo_name, slo_config in self.slos.items():
             threshold = slo_config['threshold']
             
-            if 'latency_p95' in slo_name:
-                base_metric = slo_name.replace('_p95', '')
-                current_value = self.calculate_percentile(base_metric, 95.0)
+            if slo_name in values:
+                current_value = values[slo_name]
                 status = 'BREACH' if current_value > threshold else 'OK'
             else:
                 # Handle other SLO types
@@ -261,24 +370,28 @@ metrics = MetricsCollector()
 
 # Context managers for automatic metrics recording
 class LatencyTimer:
+    __slots__ = ('metric_name', 'start_ns', '_histogram', '_increment', '_success_counter', '_error_counter')
+    
     def __init__(self, metric_name: str):
         self.metric_name = metric_name
-        self.start_time = None
+        self.start_ns = 0
+        # Resolved up front so __exit__ does no key formatting or global lookups;
+        # equivalent to metrics.record_latency(metric_name, ...)
+        self._histogram = metrics.histograms[f"{metric_name}_histogram"]
+        self._increment = metrics.increment_counter
+        self._success_counter = f"{metric_name}_success_total"
+        self._error_counter = f"{metric_name}_error_total"
     
     def __enter__(self):
-        self.start_time = time.time()
+        # Monotonic integer clock: immune to wall-clock steps, no float until the end
+        self.start_ns = time.perf_counter_ns()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.start_time:
-            latency_ms = (time.time() - self.start_time) * 1000
-            metrics.record_latency(self.metric_name, latency_ms)
-            
-            # Also increment request counter
-            if exc_type is None:
-                metrics.increment_counter(f"{self.metric_name}_success_total")
-            else:
-                metrics.increment_counter(f"{self.metric_name}_error_total")
+        self._histogram.append((time.perf_counter_ns() - self.start_ns) / 1e6)
+        
+        # Also increment request counter
+        self._increment(self._success_counter if exc_type is None else self._error_counter)
 
 if __name__ == '__main__':
     # Test metrics collection
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Client
+One pooled keep-alive httpx.AsyncClient for the memory providers
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+import httpx
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator; stdlib json otherwise
+    orjson = None
+
+# HTTP/2 needs the h2 package (httpx[http2]); plain keep-alive HTTP/1.1 otherwise
+_HTTP2 = importlib.util.find_spec('h2') is not None
+
+PROVIDER_HTTP_TIMEOUT = float(os.getenv('PROVIDER_HTTP_TIMEOUT', '30'))
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_client() -> httpx.AsyncClient:
+    """Shared client for the running event loop
+
+    Connections belong to the loop that opened them, so a new loop (scripts
+    calling asyncio.run more than once) gets a fresh client.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=_HTTP2,
+            timeout=PROVIDER_HTTP_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+        )
+        _client_loop = loop
+    return _client
+
+async def aclose_client() -> None:
+    """Close the shared client's pooled connections"""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+
+def json_body(payload: Any) -> bytes:
+    """Request body for a JSON payload, encoded by orjson when available
+    
+    Pass as content= with a Content-Type: application/json header in place of
+    httpx's json=, which always goes through the stdlib encoder.
+    """
+    if orjson is None:
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return orjson.dumps(payload)
+
+async def bounded_gather(coro_fn: Callable[[Any], Awaitable[Any]], items: Iterable[Any], concurrency: int) -> List[Any]:
+    """Await coro_fn(item) for every item with at most `concurrency` in flight
+    
+    Results are in item order; an unexpected failure yields its exception
+    instead of failing the batch.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def run_one(item: Any):
+        async with semaphore:
+            return await coro_fn(item)
+    
+    return await asyncio.gather(*(run_one(item) for item in items), return_exceptions=True)
@@ -5,11 +5,12 @@ Handles Mem0 operations with graph memory support
 """
 
 import os
-import requests
 import json
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
+from providers.http_client import get_client, aclose_client, json_body, bounded_gather
+
 class Mem0Provider:
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv('MEM0_API_KEY')
@@ -44,10 +45,10 @@ class Mem0Provider:
             }
         
         try:
-            response = requests.post(
+            response = await get_client().post(
                 f'{self.base_url}/memories',
                 headers=self.headers,
-                json=payload
+                content=json_body(payload)
             )
             response.raise_for_status()
             
@@ -59,6 +60,13 @@ class Mem0Provider:
             print(f"❌ Mem0 write failed: {e}")
             return {'error': str(e)}
     
+    async def write_many(self, items: List[Dict], concurrency: int = 16) -> List[Any]:
+        """Write several memories with at most `concurrency` requests in flight
+        
+        Items are keyword arguments for write(); see bounded_gather for results.
+        """
+        return await bounded_gather(lambda item: self.write(**item), items, concurrency)
+    
     async def search(self, query: str, user_id: str = None, limit: int = 10, filters: Dict = None) -> List[Dict]:
         """Search memories in Mem0"""
         params = {
@@ -71,7 +79,7 @@ class Mem0Provider:
             params.update(filters)
         
         try:
-            response = requests.get(
+            response = await get_client().get(
                 f'{self.base_url}/memories/search',
                 headers=self.headers,
                 params=params
@@ -84,4 +92,8 @@ class Mem0Provider:
             
         except Exception as e:
             print(f"❌ Mem0 search failed: {e}")
-            return []
\ No newline at end of file
+            return []
+    
+    async def aclose(self):
+        """Release the shared HTTP client's pooled connections"""
+        await aclose_client()
@@ -5,11 +5,12 @@ Handles SuperMemory operations for acceleration layer
 """
 
 import os
-import requests
 import json
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
+from providers.http_client import get_client, aclose_client, json_body, bounded_gather
+
 class SuperMemoryProvider:
     def __init__(self, api_key: str = None):
         self.api_key = api_key or os.getenv('SUPERMEMORY_API_KEY')
@@ -28,10 +29,10 @@ class SuperMemoryProvider:
         }
         
         try:
-            response = requests.post(
+            response = await get_client().post(
                 f'{self.base_url}/api/add',
                 headers=self.headers,
-                json=payload
+                content=json_body(payload)
             )
             response.raise_for_status()
             
@@ -43,6 +44,13 @@ class SuperMemoryProvider:
             print(f"❌ SuperMemory write failed: {e}")
             return {'error': str(e)}
     
+    async def write_many(self, items: List[Dict], concurrency: int = 16) -> List[Any]:
+        """Write several memories with at most `concurrency` requests in flight
+        
+        Items are keyword arguments for write(); see bounded_gather for results.
+        """
+        return await bounded_gather(lambda item: self.write(**item), items, concurrency)
+    
     async def search(self, query: str, limit: int = 10, filters: Dict = None) -> List[Dict]:
         """Fast search via SuperMemory acceleration"""
         payload = {
@@ -52,10 +60,10 @@ class SuperMemoryProvider:
         }
         
         try:
-            response = requests.post(
+            response = await get_client().post(
                 f'{self.base_url}/api/search',
                 headers=self.headers,
-                json=payload
+                content=json_body(payload)
             )
             response.raise_for_status()
             
@@ -67,6 +75,10 @@ class SuperMemoryProvider:
             print(f"❌ SuperMemory search failed: {e}")
             return []
     
+    async def aclose(self):
+        """Release the shared HTTP client's pooled connections"""
+        await aclose_client()
+    
     async def accelerated_recall(self, query: str, neo4j_client = None) -> List[Dict]:
         """SuperMemory acceleration with Neo4j fallback"""
         # Fast retrieval via SuperMemory
@@ -80,22 +92,28 @@ class SuperMemoryProvider:
     
     async def _sync_to_graph(self, memories: List[Dict], neo4j_client) -> None:
         """Sync SuperMemory results to Neo4j graph"""
-        for memory in memories:
-            # Create memory node in graph
-            cypher = """
-            MERGE (m:Memory {id: $memory_id})
-            SET m.content = $content,
-                m.timestamp = $timestamp,
-                m.source = 'supermemory',
-                m.synced_at = datetime()
-            """
-            
-            params = {
-                'memory_id': memory.get('id'),
+        # One UNWIND round-trip for the whole result set; rows without an id
+        # can't be merged and are skipped
+        cypher = """
+        UNWIND $rows AS row
+        MERGE (m:Memory {id: row.memory_id})
+        SET m.content = row.content,
+            m.timestamp = row.timestamp,
+            m.source = 'supermemory',
+            m.synced_at = datetime()
+        """
+        
+        rows = [
+            {
+                'memory_id': memory['id'],
                 'content': memory.get('content', ''),
                 'timestamp': memory.get('timestamp', '')
             }
+            for memory in memories
+            if memory.get('id') is not None
+        ]
+        
+        if rows:
+            await neo4j_client.cypher(cypher, {'rows': rows})
             
-            await neo4j_client.cypher(cypher, params)
-            
-        print(f"✅ Synced {len(memories)} memories to Neo4j")
\ No newline at end of file
+        print(f"✅ Synced {len(rows)} memories to Neo4j")
\ No newline at end of file
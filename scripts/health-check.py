@@ -4,55 +4,139 @@ Comprehensive Health Check
 Validates all components of the memory master system
 """
 
+import asyncio
+import functools
 import os
 import sys
-import requests
 import json
+import time
+
+import httpx
 from datetime import datetime
-from typing import Dict, List
+from typing import Awaitable, Dict, List
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator; stdlib json otherwise
+    orjson = None
+
+try:
+    import uvloop
+    _run = uvloop.run
+except ImportError:  # Optional libuv event loop (no Windows support); asyncio's otherwise
+    _run = asyncio.run
+
+# Local services are addressed by IP so probes skip the resolver (slow NSS or
+# WSL setups can take milliseconds to resolve localhost)
+HEALTHCHECK_HOST = os.getenv('HEALTHCHECK_HOST', '127.0.0.1')
+
+# Hard wall-clock cap per probe group; probes still running are reported as
+# TIMEOUT_BUDGET instead of holding up the whole report
+HEALTH_CHECK_BUDGET_S = float(os.getenv('HEALTH_CHECK_BUDGET', '2.0'))
+
+# Probe results are cached on disk so repeated runs (dashboards polling, make
+# targets chaining the script) don't re-probe every dependency. Local services
+# change faster than external API reachability, so they expire sooner;
+# HEALTHCHECK_TTL overrides every group (0 disables), --no-cache skips reads.
+CACHE_PATH = os.path.expanduser(os.getenv('HEALTHCHECK_CACHE', '~/.cache/glaciereq-healthcheck.json'))
+CACHE_TTL_S = {'services': 10.0, 'api_endpoints': 10.0, 'external_apis': 60.0}
+
+# External APIs failing this many runs in a row are skipped (reported as
+# circuit open) for min(CIRCUIT_MAX_OPEN_S, 2**failures) seconds
+CIRCUIT_FAILURE_THRESHOLD = 2
+CIRCUIT_MAX_OPEN_S = 60.0
+if os.getenv('HEALTHCHECK_TTL'):
+    CACHE_TTL_S = dict.fromkeys(CACHE_TTL_S, float(os.getenv('HEALTHCHECK_TTL')))
+
+# --serve mode: GET /healthz on this port answers from the last report, which a
+# background loop refreshes every HEALTHCHECK_REFRESH seconds. The report is
+# unauthenticated, so it binds to loopback unless HEALTHCHECK_BIND says otherwise
+HEALTHCHECK_BIND = os.getenv('HEALTHCHECK_BIND', '127.0.0.1')
+HEALTHCHECK_PORT = int(os.getenv('HEALTHCHECK_PORT', '8081'))
+HEALTHCHECK_REFRESH_S = float(os.getenv('HEALTHCHECK_REFRESH', '10'))
+
+# Endpoint probes only parse JSON bodies smaller than this; status is all the
+# report needs, the data is kept for --json consumers
+MAX_PROBE_JSON_BYTES = 16 * 1024
+
+# Report line prefixes
+_OK = "  ✅ "
+_BAD = "  ❌ "
+
+REQUIRED_ENV_VARS = (
+    'NEO4J_URI', 'NEO4J_USER', 'NEO4J_PASSWORD',
+    'MEM0_API_KEY', 'SUPERMEMORY_API_KEY', 'CASE_NUMBER'
+)
 
 def check_environment() -> Dict:
     """Check environment configuration"""
-    required_vars = [
-        'NEO4J_URI', 'NEO4J_USER', 'NEO4J_PASSWORD',
-        'MEM0_API_KEY', 'SUPERMEMORY_API_KEY', 'CASE_NUMBER'
-    ]
-    
-    env_status = {}
-    for var in required_vars:
-        value = os.getenv(var)
-        env_status[var] = {
-            'set': bool(value),
-            'length': len(value) if value else 0
-        }
+    env = os.environ
+    return {
+        var: {'set': bool(value := env.get(var, '')), 'length': len(value)}
+        for var in REQUIRED_ENV_VARS
+    }
+
+async def _within_budget(probes: Dict[str, Awaitable[Dict]], timed_out: Dict) -> Dict:
+    """Run probes concurrently; any unfinished at the budget get timed_out"""
+    tasks = {name: asyncio.ensure_future(probe) for name, probe in probes.items()}
+    if not tasks:
+        return {}
     
-    return env_status
+    done, pending = await asyncio.wait(tasks.values(), timeout=HEALTH_CHECK_BUDGET_S)
+    for task in pending:
+        task.cancel()
+    return {name: task.result() if task in done else dict(timed_out) for name, task in tasks.items()}
 
-def check_services() -> Dict:
-    """Check service connectivity"""
-    services = {
-        'neo4j': 'http://localhost:7474',
-        'chromadb': 'http://localhost:8000/api/v1/heartbeat',
-        'api_server': 'http://localhost:8080/health'
+async def check_services(client: httpx.AsyncClient) -> Dict:
+    """Check service connectivity
+    
+    Neo4j and ChromaDB only need to be listening, so they get a bare TCP
+    connect; the API server is asked for /health over HTTP.
+    """
+    tcp_services = {
+        'neo4j': (HEALTHCHECK_HOST, 7474),
+        'chromadb': (HEALTHCHECK_HOST, 8000)
+    }
+    http_services = {
+        'api_server': f'http://{HEALTHCHECK_HOST}:8080/health'
     }
     
-    service_status = {}
-    for name, url in services.items():
+    async def tcp_probe(host: str, port: int) -> Dict:
+        start_ns = time.perf_counter_ns()
         try:
-            response = requests.get(url, timeout=5)
-            service_status[name] = {
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout=1.0)
+        except Exception as e:
+            return {
+                'status': 'DOWN',
+                'error': str(e) or type(e).__name__
+            }
+        elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+        writer.close()
+        return {
+            'status': 'UP',
+            'response_time': elapsed
+        }
+    
+    async def http_probe(url: str) -> Dict:
+        try:
+            start_ns = time.perf_counter_ns()
+            response = await client.get(url, timeout=5)
+            return {
                 'status': 'UP' if response.status_code == 200 else f'ERROR_{response.status_code}',
-                'response_time': response.elapsed.total_seconds()
+                'response_time': (time.perf_counter_ns() - start_ns) / 1e9
             }
         except Exception as e:
-            service_status[name] = {
+            return {
                 'status': 'DOWN',
                 'error': str(e)
             }
     
-    return service_status
+    # All probes in flight at once: wall time is the slowest probe, capped
+    probes = {name: tcp_probe(host, port) for name, (host, port) in tcp_services.items()}
+    probes.update((name, http_probe(url)) for name, url in http_services.items())
+    return await _within_budget(probes, {'status': 'TIMEOUT_BUDGET'})
 
-def check_api_endpoints() -> Dict:
+async def check_api_endpoints(client: httpx.AsyncClient) -> Dict:
     """Test API endpoints"""
     endpoints = [
         ('GET', '/health'),
@@ -60,136 +144,333 @@ def check_api_endpoints() -> Dict:
         ('GET', '/env/status')
     ]
     
-    endpoint_status = {}
-    base_url = 'http://localhost:8080'
+    base_url = f'http://{HEALTHCHECK_HOST}:8080'
     
-    for method, path in endpoints:
+    async def probe(method: str, path: str) -> Dict:
         try:
-            if method == 'GET':
-                response = requests.get(f'{base_url}{path}', timeout=5)
-            
-            endpoint_status[path] = {
+            start_ns = time.perf_counter_ns()
+            # Streamed so only small JSON bodies are read at all; anything
+            # larger (or unsized) is left unread and reported without data
+            async with client.stream(method, f'{base_url}{path}', timeout=5) as response:
+                elapsed = (time.perf_counter_ns() - start_ns) / 1e9
+                headers = response.headers
+                data = None
+                if (headers.get('content-type', '').startswith('application/json')
+                        and int(headers.get('content-length') or MAX_PROBE_JSON_BYTES) < MAX_PROBE_JSON_BYTES):
+                    body = await response.aread()
+                    data = orjson.loads(body) if orjson is not None else json.loads(body)
+            return {
                 'status': response.status_code,
-                'response_time': response.elapsed.total_seconds(),
-                'data': response.json() if response.headers.get('content-type', '').startswith('application/json') else None
+                'response_time': elapsed,
+                'data': data
             }
         except Exception as e:
-            endpoint_status[path] = {
+            return {
                 'status': 'ERROR',
                 'error': str(e)
             }
     
-    return endpoint_status
+    return await _within_budget(
+        {path: probe(method, path) for method, path in endpoints},
+        {'status': 'TIMEOUT_BUDGET'}
+    )
 
-def check_external_apis() -> Dict:
-    """Test external API connectivity"""
-    api_status = {}
+async def check_external_apis(client: httpx.AsyncClient, circuits: Dict = None) -> Dict:
+    """Test external API connectivity
+    
+    circuits holds per-API breaker state ({'failures', 'open_until'}) across
+    runs and is updated in place; APIs whose circuit is open aren't probed.
+    """
+    circuits = {} if circuits is None else circuits
+    probes = {}
     
     # Test Mem0
     mem0_key = os.getenv('MEM0_API_KEY')
     if mem0_key:
-        try:
-            response = requests.get(
-                'https://api.mem0.ai/v1/memories',
-                headers={'Authorization': f'Bearer {mem0_key}'},
-                timeout=10
-            )
-            api_status['mem0'] = {
-                'reachable': response.status_code in [200, 401],  # 401 is ok - means API is up
-                'status_code': response.status_code
-            }
-        except Exception as e:
-            api_status['mem0'] = {
-                'reachable': False,
-                'error': str(e)
-            }
+        probes['mem0'] = ('https://api.mem0.ai/v1/memories', mem0_key)
     
     # Test SuperMemory
     supermemory_key = os.getenv('SUPERMEMORY_API_KEY')
     supermemory_url = os.getenv('SUPERMEMORY_BASE_URL', 'https://api.supermemory.ai')
     if supermemory_key:
+        probes['supermemory'] = (f'{supermemory_url}/api/health', supermemory_key)
+    
+    async def probe(url: str, api_key: str) -> Dict:
+        # HEAD: reachability needs only the status line, not the response body
         try:
-            response = requests.get(
-                f'{supermemory_url}/api/health',
-                headers={'Authorization': f'Bearer {supermemory_key}'},
-                timeout=10
+            response = await client.head(
+                url,
+                headers={'Authorization': f'Bearer {api_key}'},
+                follow_redirects=False,
+                timeout=5
             )
-            api_status['supermemory'] = {
-                'reachable': response.status_code in [200, 401],
+            return {
+                # 401 is ok - means API is up; so is 405 from a GET-only route
+                'reachable': response.status_code in [200, 401, 405],
                 'status_code': response.status_code
             }
         except Exception as e:
-            api_status['supermemory'] = {
+            return {
                 'reachable': False,
                 'error': str(e)
             }
     
-    return api_status
+    now = time.time()
+    skipped = {
+        name: {'reachable': False, 'circuit': 'open', 'error': 'CIRCUIT_OPEN'}
+        for name in probes
+        if now < circuits.get(name, {}).get('open_until', 0)
+    }
+    
+    results = await _within_budget(
+        {name: probe(url, key) for name, (url, key) in probes.items() if name not in skipped},
+        {'reachable': False, 'error': 'TIMEOUT_BUDGET'}
+    )
+    
+    for name, result in results.items():
+        if result['reachable']:
+            circuits.pop(name, None)
+            continue
+        failures = circuits.get(name, {}).get('failures', 0) + 1
+        circuits[name] = {'failures': failures, 'open_until': 0}
+        if failures >= CIRCUIT_FAILURE_THRESHOLD:
+            circuits[name]['open_until'] = now + min(CIRCUIT_MAX_OPEN_S, 2 ** failures)
+    
+    return {name: skipped.get(name) or results[name] for name in probes}
+
+def _load_cache() -> Dict:
+    try:
+        with open(CACHE_PATH, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_cache(cache: Dict):
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp_path = f'{CACHE_PATH}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, CACHE_PATH)  # Concurrent runs never read a partial file
+    except OSError:
+        pass  # Caching is best-effort
+
+async def _cached_check(name: str, check, client: httpx.AsyncClient, cache: Dict, use_cache: bool) -> Dict:
+    """A check group's result, from the cache while it is within its TTL"""
+    entry = cache.get(name)
+    if use_cache and entry and time.time() - entry.get('timestamp', 0) < CACHE_TTL_S[name]:
+        return entry['result']
+    
+    result = await check(client)
+    cache[name] = {'timestamp': time.time(), 'result': result}
+    return result
+
+async def run_network_checks(use_cache: bool = True) -> tuple:
+    """Service, endpoint and external API checks, all concurrently on one client"""
+    cache = _load_cache()
+    circuits = cache.setdefault('circuits', {})
+    
+    # Probes to the same origin share keep-alive connections from this pool
+    async with httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=16, max_connections=32)) as client:
+        results = await asyncio.gather(
+            _cached_check('services', check_services, client, cache, use_cache),
+            _cached_check('api_endpoints', check_api_endpoints, client, cache, use_cache),
+            _cached_check('external_apis', functools.partial(check_external_apis, circuits=circuits),
+                          client, cache, use_cache)
+        )
+    
+    _save_cache(cache)
+    return results
+
+class _Out:
+    """Report lines collected in memory and written to stdout in one call
+    
+    The report is only complete once every check has finished, so nothing is
+    lost by holding it; -q writes just the final status line.
+    """
+    
+    def __init__(self):
+        self.lines: List[str] = []
+        self.status_line = ''
+    
+    def __call__(self, text: str = ''):
+        self.lines.append(text)
+    
+    def status(self, text: str):
+        self.status_line = text.strip()
+        self.lines.append(text)
+    
+    def flush(self, quiet: bool = False):
+        sys.stdout.write((self.status_line if quiet else '\n'.join(self.lines)) + '\n')
+        sys.stdout.flush()
+
+def _encode_json(result: Dict) -> bytes:
+    if orjson is None:
+        return json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return orjson.dumps(result)
+
+def _write_json(result: Dict):
+    """Write the report as one JSON line for CI gates and dashboards"""
+    sys.stdout.write(_encode_json(result).decode('utf-8') + '\n')
+
+class HealthDaemon:
+    """Health report served from memory at GET /healthz (ASGI app)
+    
+    refresh_loop re-runs every probe group on one long-lived client, so polls
+    cost neither interpreter startup nor probes: each is answered with the
+    prebuilt body of the last report (200 when healthy, 503 otherwise).
+    """
+    
+    def __init__(self, refresh_s: float = HEALTHCHECK_REFRESH_S):
+        self.refresh_s = refresh_s
+        self._status = 503
+        self._body = _encode_json({'ok': False, 'status': 'STARTING'})
+    
+    async def refresh_loop(self):
+        circuits = {}  # Breaker state lives across refreshes, as the disk cache does for the CLI
+        async with httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=16, max_connections=32)) as client:
+            while True:
+                service_status, endpoint_status, api_status = await asyncio.gather(
+                    check_services(client),
+                    check_api_endpoints(client),
+                    check_external_apis(client, circuits=circuits)
+                )
+                healthy = (all(status['status'] == 'UP' for status in service_status.values())
+                           and all(status['status'] == 200 for status in endpoint_status.values()))
+                # Endpoint bodies (e.g. /env/status's masked secrets) and the
+                # environment check stay out of the served report
+                self._body = _encode_json({
+                    'timestamp': f"{datetime.utcnow().isoformat()}Z",
+                    'services': service_status,
+                    'endpoints': {
+                        path: {key: value for key, value in status.items() if key != 'data'}
+                        for path, status in endpoint_status.items()
+                    },
+                    'external': api_status,
+                    'ok': healthy
+                })
+                self._status = 200 if healthy else 503
+                await asyncio.sleep(self.refresh_s)
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        if scope['path'] == '/healthz':
+            status, body = self._status, self._body
+            content_type = b'application/json'
+        else:
+            status, body = 404, b'Not Found'
+            content_type = b'text/plain'
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', content_type), (b'content-length', str(len(body)).encode())]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+async def serve(host: str = HEALTHCHECK_BIND, port: int = HEALTHCHECK_PORT):
+    """Run the /healthz daemon until interrupted"""
+    import uvicorn
+    
+    daemon = HealthDaemon()
+    server = uvicorn.Server(uvicorn.Config(daemon, host=host, port=port, lifespan='off', log_level='warning'))
+    refresher = asyncio.create_task(daemon.refresh_loop())
+    try:
+        await server.serve()
+    finally:
+        refresher.cancel()
 
 def main():
-    print("🏥 GlacierEQ Memory Master - Comprehensive Health Check")
-    print("======================================================")
-    print(f"Timestamp: {datetime.utcnow().isoformat()}Z\n")
+    if '--serve' in sys.argv[1:]:
+        print(f"🏥 Serving health reports at http://{HEALTHCHECK_BIND}:{HEALTHCHECK_PORT}/healthz "
+              f"(refreshed every {HEALTHCHECK_REFRESH_S:g}s)")
+        _run(serve())
+        return 0
+    
+    quiet = '-q' in sys.argv[1:]
+    as_json = '--json' in sys.argv[1:]
+    out = _Out()
+    out("🏥 GlacierEQ Memory Master - Comprehensive Health Check")
+    out("======================================================")
+    timestamp = f"{datetime.utcnow().isoformat()}Z"
+    out(f"Timestamp: {timestamp}\n")
     
     # Environment check
-    print("🔧 Environment Configuration:")
+    out("🔧 Environment Configuration:")
     env_status = check_environment()
     for var, status in env_status.items():
-        icon = "✅" if status['set'] else "❌"
-        print(f"  {icon} {var}: {'SET' if status['set'] else 'MISSING'}")
+        out(f"{_OK}{var}: SET" if status['set'] else f"{_BAD}{var}: MISSING")
+    
+    # Network checks run together; results are reported in the usual order
+    service_status, endpoint_status, api_status = _run(
+        run_network_checks(use_cache='--no-cache' not in sys.argv[1:])
+    )
+    
+    # Overall status is tallied while each section is printed
+    all_services_up = all_apis_ok = external_apis_ok = True
     
     # Service connectivity
-    print("\n🐳 Service Connectivity:")
-    service_status = check_services()
+    out("\n🐳 Service Connectivity:")
     for name, status in service_status.items():
         if status['status'] == 'UP':
-            print(f"  ✅ {name}: UP ({status['response_time']:.3f}s)")
+            out(f"{_OK}{name}: UP ({status['response_time']:.3f}s)")
         else:
-            print(f"  ❌ {name}: {status['status']}")
+            all_services_up = False
+            out(f"{_BAD}{name}: {status['status']}")
             if 'error' in status:
-                print(f"     Error: {status['error']}")
+                out(f"     Error: {status['error']}")
     
     # API endpoints
-    print("\n📡 API Endpoints:")
-    endpoint_status = check_api_endpoints()
+    out("\n📡 API Endpoints:")
     for path, status in endpoint_status.items():
         if status['status'] == 200:
-            print(f"  ✅ {path}: OK ({status['response_time']:.3f}s)")
+            out(f"{_OK}{path}: OK ({status['response_time']:.3f}s)")
         else:
-            print(f"  ❌ {path}: {status['status']}")
+            all_apis_ok = False
+            out(f"{_BAD}{path}: {status['status']}")
     
     # External APIs
-    print("\n🌐 External API Connectivity:")
-    api_status = check_external_apis()
+    out("\n🌐 External API Connectivity:")
     for name, status in api_status.items():
         if status['reachable']:
-            print(f"  ✅ {name}: REACHABLE")
+            out(f"{_OK}{name}: REACHABLE")
+        elif status.get('circuit') == 'open':
+            external_apis_ok = False
+            out(f"{_BAD}⚡ {name}: UNREACHABLE (circuit open, probe skipped)")
         else:
-            print(f"  ❌ {name}: UNREACHABLE")
+            external_apis_ok = False
+            out(f"{_BAD}{name}: UNREACHABLE")
             if 'error' in status:
-                print(f"     Error: {status['error']}")
-    
-    # Overall status
-    all_services_up = all(s['status'] == 'UP' for s in service_status.values())
-    all_apis_ok = all(s['status'] == 200 for s in endpoint_status.values())
-    external_apis_ok = all(s['reachable'] for s in api_status.values())
-    
-    print("\n📊 SYSTEM STATUS:")
-    print(f"  Services: {'✅ ALL UP' if all_services_up else '❌ ISSUES DETECTED'}")
-    print(f"  API Endpoints: {'✅ ALL OK' if all_apis_ok else '❌ ISSUES DETECTED'}")
-    print(f"  External APIs: {'✅ ALL REACHABLE' if external_apis_ok else '⚠️  SOME UNREACHABLE'}")
-    
-    if all_services_up and all_apis_ok:
-        print("\n🎉 SYSTEM HEALTHY - Ready for operation!")
-        print("\n🚀 Next Steps:")
-        print("   1. Run Phase 1 migration: python3 scripts/migration-helper.py")
-        print("   2. Configure Sigma File Manager 2 with ui/sigma/config.json")
-        print("   3. Test memory operations:")
-        print("      curl -X POST http://localhost:8080/memory/write -d '{\"content\":\"test\",\"entity\":\"test\"}'")
-        return 0
+                out(f"     Error: {status['error']}")
+    
+    out("\n📊 SYSTEM STATUS:")
+    out(f"  Services: {'✅ ALL UP' if all_services_up else '❌ ISSUES DETECTED'}")
+    out(f"  API Endpoints: {'✅ ALL OK' if all_apis_ok else '❌ ISSUES DETECTED'}")
+    out(f"  External APIs: {'✅ ALL REACHABLE' if external_apis_ok else '⚠️  SOME UNREACHABLE'}")
+    
+    healthy = all_services_up and all_apis_ok
+    if healthy:
+        out.status("\n🎉 SYSTEM HEALTHY - Ready for operation!")
+        out("\n🚀 Next Steps:")
+        out("   1. Run Phase 1 migration: python3 scripts/migration-helper.py")
+        out("   2. Configure Sigma File Manager 2 with ui/sigma/config.json")
+        out("   3. Test memory operations:")
+        out("      curl -X POST http://localhost:8080/memory/write -d '{\"content\":\"test\",\"entity\":\"test\"}'")
+    else:
+        out.status("\n⚠️  SYSTEM ISSUES DETECTED - Review errors above")
+    
+    if as_json:
+        _write_json({
+            'timestamp': timestamp,
+            'env': env_status,
+            'services': service_status,
+            'endpoints': endpoint_status,
+            'external': api_status,
+            'ok': healthy
+        })
     else:
-        print("\n⚠️  SYSTEM ISSUES DETECTED - Review errors above")
-        return 1
+        out.flush(quiet)
+    return 0 if healthy else 1
 
 if __name__ == '__main__':
     sys.exit(main())
\ No newline at end of file
@@ -6,61 +6,108 @@ Migrates Phase 1 repositories using git subtree with history preservation
 
 import os
 import subprocess
+import sys
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator; stdlib json otherwise
+    orjson = None
+
+MAX_PARALLEL_FETCHES = 8
+COMMAND_OUTPUT_TAIL = 200  # Lines of command output kept for error reports
 
 class MigrationHelper:
-    def __init__(self):
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+        
         # Load consolidation config
-        with open('consolidation-config.json', 'r') as f:
-            self.config = json.load(f)
+        with open('consolidation-config.json', 'rb') as f:
+            data = f.read()
+        self.config = orjson.loads(data) if orjson is not None else json.loads(data)
         
         self.github_org = self.config['github_org']
         self.source_repos = self.config['source_repos']
         
     def run_command(self, cmd: List[str], cwd: str = '.') -> tuple[bool, str]:
-        """Run shell command and return success status and output"""
+        """Run shell command and return success status and output
+        
+        Output (stdout and stderr together) is streamed line by line and only
+        the last COMMAND_OUTPUT_TAIL lines are kept, so fetching a large
+        repository doesn't buffer all of git's output in memory. With verbose
+        set, lines are echoed as they arrive.
+        """
         try:
-            result = subprocess.run(
-                cmd, 
+            proc = subprocess.Popen(
+                cmd,
                 cwd=cwd,
-                capture_output=True,
-                text=True,
-                check=True
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=1,
+                text=True
             )
-            return True, result.stdout
-        except subprocess.CalledProcessError as e:
-            return False, f"Error: {e.stderr}"
+        except OSError as e:
+            return False, f"Error: {e}"
+        
+        tail = deque(maxlen=COMMAND_OUTPUT_TAIL)
+        with proc:
+            for line in proc.stdout:
+                if self.verbose:
+                    print(f"    {line}", end='')
+                tail.append(line)
+        
+        output = ''.join(tail)
+        if proc.returncode != 0:
+            return False, f"Error: {output}"
+        return True, output
     
-    def migrate_repository(self, target_path: str, source_repo: str) -> bool:
-        """Migrate repository using git subtree"""
-        print(f"🚚 Migrating {source_repo} → {target_path}")
-        
-        # Create target directory
-        Path(target_path).mkdir(parents=True, exist_ok=True)
-        
-        # Add remote
-        remote_name = f"{source_repo}-remote"
+    def _remote_name(self, source_repo: str) -> str:
+        return f"{source_repo}-remote"
+    
+    def _add_remote(self, source_repo: str) -> bool:
+        """Register the source repository as a remote (edits .git/config, so serial)"""
+        remote_name = self._remote_name(source_repo)
         remote_url = f"https://github.com/{self.github_org}/{source_repo}.git"
         
         success, output = self.run_command(['git', 'remote', 'add', remote_name, remote_url])
         if not success and 'already exists' not in output:
-            print(f"  ❌ Failed to add remote: {output}")
+            print(f"  ❌ Failed to add remote for {source_repo}: {output}")
             return False
+        return True
+    
+    def _fetch(self, source_repo: str) -> bool:
+        """Fetch the source's main branch; safe to run alongside other fetches
         
-        # Fetch repository
+        FETCH_HEAD is not written, since concurrent fetches would race on it.
+        Fetches stay full-depth: shallow fetches all take .git/shallow.lock.
+        """
         print(f"  📥 Fetching {source_repo}...")
-        success, output = self.run_command(['git', 'fetch', remote_name])
+        remote_name = self._remote_name(source_repo)
+        success, output = self.run_command([
+            'git', 'fetch', '--no-write-fetch-head',
+            remote_name, f'main:refs/remotes/{remote_name}/main'
+        ])
         if not success:
-            print(f"  ❌ Failed to fetch: {output}")
+            print(f"  ❌ Failed to fetch {source_repo}: {output}")
             return False
+        return True
+    
+    def _add_remote_and_fetch(self, source_repo: str) -> bool:
+        return self._add_remote(source_repo) and self._fetch(source_repo)
+    
+    def _apply_subtree(self, target_path: str, source_repo: str) -> bool:
+        """Add the fetched branch as a subtree (writes index and HEAD, so serial)"""
+        print(f"  🌳 Adding subtree {source_repo} → {target_path}...")
         
-        # Add as subtree (preserves history)
-        print(f"  🌳 Adding subtree...")
+        # From the already-fetched ref, so subtree doesn't fetch again
         success, output = self.run_command([
             'git', 'subtree', 'add', 
             '--prefix', target_path,
-            remote_name, 'main', 
+            f"{self._remote_name(source_repo)}/main",
             '--squash'
         ])
         
@@ -71,15 +118,31 @@ class MigrationHelper:
         print(f"  ✅ Migration complete: {source_repo}")
         return True
     
+    def migrate_repository(self, target_path: str, source_repo: str) -> bool:
+        """Migrate repository using git subtree"""
+        print(f"🚚 Migrating {source_repo} → {target_path}")
+        return self._add_remote_and_fetch(source_repo) and self._apply_subtree(target_path, source_repo)
+    
     def run_phase_1_migration(self) -> Dict[str, bool]:
         """Execute Phase 1 critical repository migrations"""
         print("🚀 PHASE 1 MIGRATION: Critical Memory Core")
         print("=" * 50)
         
-        results = {}
+        repos = list(self.source_repos.items())
         
-        for target_path, source_repo in self.source_repos.items():
-            success = self.migrate_repository(target_path, source_repo)
+        # Remotes are added one by one (each edits .git/config); the fetches,
+        # which dominate migration time, then run in parallel
+        added = {source_repo: self._add_remote(source_repo) for _, source_repo in repos}
+        to_fetch = [source_repo for source_repo, ok in added.items() if ok]
+        fetched = dict.fromkeys(added, False)
+        if to_fetch:
+            with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_FETCHES, len(to_fetch))) as pool:
+                fetched.update(zip(to_fetch, pool.map(self._fetch, to_fetch)))
+        
+        # Subtree adds mutate the index, so they stay sequential
+        results = {}
+        for target_path, source_repo in repos:
+            success = fetched[source_repo] and self._apply_subtree(target_path, source_repo)
             results[source_repo] = success
             
             if success:
@@ -119,7 +182,7 @@ class MigrationHelper:
         return validation_results
 
 if __name__ == '__main__':
-    migrator = MigrationHelper()
+    migrator = MigrationHelper(verbose='--verbose' in sys.argv[1:])
     
     print("GlacierEQ Memory Master - Migration Helper")
     print("Phase 1: Critical Memory Core Migration\n")
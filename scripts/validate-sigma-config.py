@@ -4,45 +4,99 @@ Sigma Configuration Validator
 Validates Sigma File Manager 2 configuration and provides setup instructions
 """
 
+import asyncio
+import importlib.util
 import json
 import os
-import requests
+import sys
 from datetime import datetime
+from typing import Callable, Dict, List, Tuple
 
-def validate_sigma_config():
-    """Validate Sigma FM2 configuration file"""
+import httpx
+
+try:
+    import orjson
+except ImportError:  # Optional accelerator; stdlib json otherwise
+    orjson = None
+
+try:
+    import uvloop
+    _run = uvloop.run
+except ImportError:  # Optional libuv event loop (no Windows support); asyncio's otherwise
+    _run = asyncio.run
+
+# The API is probed by IP so requests skip the resolver; override for remote hosts
+HEALTHCHECK_HOST = os.getenv('HEALTHCHECK_HOST', '127.0.0.1')
+
+# HTTP/2 needs the h2 package (httpx[http2]); over https the probes then
+# multiplex on one connection, otherwise they share keep-alive connections
+_HTTP2 = importlib.util.find_spec('h2') is not None
+
+# Report line prefixes
+_OK = "   ✅ "
+_BAD = "   ❌ "
+_WARN = "   ⚠️  "
+
+# Parsed configs keyed by (path, mtime_ns, size): re-validating an unchanged
+# file within one process skips the parse
+_CFG_CACHE: Dict[Tuple[str, int, int], Dict] = {}
+
+def _load_config(config_path: str) -> Dict:
+    """Parse a JSON config file, reusing the last parse while it is unchanged"""
+    st = os.stat(config_path)
+    key = (config_path, st.st_mtime_ns, st.st_size)
+    config = _CFG_CACHE.get(key)
+    if config is None:
+        with open(config_path, 'rb') as f:
+            data = f.read()
+        config = orjson.loads(data) if orjson is not None else json.loads(data)
+        _CFG_CACHE.clear()  # Only the current version of a file is worth keeping
+        _CFG_CACHE[key] = config
+    return config
+
+async def _probe_endpoints(base_url: str, paths: List[str]) -> List:
+    """GET every path concurrently; a response or the exception, per path"""
+    async with httpx.AsyncClient(
+        http2=_HTTP2,
+        base_url=base_url,
+        timeout=5.0,
+        limits=httpx.Limits(max_keepalive_connections=16, max_connections=32)
+    ) as client:
+        return await asyncio.gather(*(client.get(path) for path in paths), return_exceptions=True)
+
+def validate_sigma_config(out: Callable[[str], None] = print):
+    """Validate Sigma FM2 configuration file
+    
+    Report lines go to out; main() collects them and writes the report once.
+    """
     config_path = 'ui/sigma/config.json'
     
-    print("🖥️  SIGMA FILE MANAGER 2 - Configuration Validator")
-    print("=" * 55)
+    out("🖥️  SIGMA FILE MANAGER 2 - Configuration Validator")
+    out("=" * 55)
     
     # Check if config file exists
     if not os.path.exists(config_path):
-        print("❌ Sigma config not found at ui/sigma/config.json")
+        out("❌ Sigma config not found at ui/sigma/config.json")
         return False
     
     try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        config = _load_config(config_path)
         
-        print(f"✅ Configuration file loaded successfully")
+        out(f"✅ Configuration file loaded successfully")
         
         # Validate workspace
         workspace = config.get('workspace', '')
-        print(f"📝 Workspace: {workspace}")
+        out(f"📝 Workspace: {workspace}")
         
         # Validate tabs
         tabs = config.get('tabs', [])
-        print(f"📑 Tabs configured: {len(tabs)}")
+        out(f"📑 Tabs configured: {len(tabs)}")
         
         for tab in tabs:
-            tab_name = tab.get('name', 'Unknown')
-            tab_icon = tab.get('icon', '')
-            tab_type = tab.get('type', '')
-            print(f"   {tab_icon} {tab_name} ({tab_type})")
+            out(f"   {tab.get('icon', '')} {tab.get('name', 'Unknown')} ({tab.get('type', '')})")
         
         # Test API connectivity for each endpoint
-        print(f"\n🔌 Testing API Connectivity:")
+        out(f"\n🔌 Testing API Connectivity:")
         
         test_endpoints = [
             ('Health Check', 'GET', '/health'),
@@ -55,84 +109,84 @@ def validate_sigma_config():
             ('SLO Dashboard', 'GET', '/metrics/slo')
         ]
         
-        base_url = 'http://localhost:8080'
+        base_url = f'http://{HEALTHCHECK_HOST}:8080'
         successful_endpoints = 0
         
-        for name, method, endpoint in test_endpoints:
-            try:
-                if method == 'GET':
-                    response = requests.get(f'{base_url}{endpoint}', timeout=5)
-                
-                if response.status_code == 200:
-                    print(f"   ✅ {name}: OK")
-                    successful_endpoints += 1
-                else:
-                    print(f"   ❌ {name}: HTTP {response.status_code}")
-                    
-            except requests.exceptions.ConnectionError:
-                print(f"   ⚠️  {name}: API server not running")
-            except Exception as e:
-                print(f"   ❌ {name}: {str(e)[:50]}...")
-        
-        print(f"\n📊 Endpoint Connectivity: {successful_endpoints}/{len(test_endpoints)} OK")
+        # All probes in flight together; results are reported in list order
+        responses = _run(_probe_endpoints(base_url, [endpoint for _, _, endpoint in test_endpoints]))
+        
+        for (name, method, endpoint), response in zip(test_endpoints, responses):
+            if isinstance(response, httpx.ConnectError):
+                out(f"{_WARN}{name}: API server not running")
+            elif isinstance(response, Exception):
+                out(f"{_BAD}{name}: {str(response)[:50]}...")
+            elif response.status_code == 200:
+                out(f"{_OK}{name}: OK")
+                successful_endpoints += 1
+            else:
+                out(f"{_BAD}{name}: HTTP {response.status_code}")
+        
+        out(f"\n📊 Endpoint Connectivity: {successful_endpoints}/{len(test_endpoints)} OK")
         
         # Sigma setup instructions
-        print(f"\n📋 SIGMA FILE MANAGER 2 SETUP INSTRUCTIONS:")
-        print("=" * 45)
-        print("1. Open Sigma File Manager 2")
-        print("2. Go to Workspace Settings")
-        print("3. Import Configuration:")
-        print(f"   📄 File: {os.path.abspath(config_path)}")
-        print(f"   🏷️  Workspace Name: {workspace}")
-        print("4. Verify tab configuration:")
+        out(f"\n📋 SIGMA FILE MANAGER 2 SETUP INSTRUCTIONS:")
+        out("=" * 45)
+        out("1. Open Sigma File Manager 2")
+        out("2. Go to Workspace Settings")
+        out("3. Import Configuration:")
+        out(f"   📄 File: {os.path.abspath(config_path)}")
+        out(f"   🏷️  Workspace Name: {workspace}")
+        out("4. Verify tab configuration:")
         
         for tab in tabs:
             tab_name = tab.get('name')
             tab_icon = tab.get('icon')
-            print(f"   {tab_icon} {tab_name} Tab")
+            out(f"   {tab_icon} {tab_name} Tab")
             
             if tab.get('type') == 'api_form':
                 endpoints = tab.get('endpoints', {})
-                print(f"      API Endpoints: {len(endpoints)} configured")
+                out(f"      API Endpoints: {len(endpoints)} configured")
             elif tab.get('type') == 'embed_panels':
                 panels = tab.get('panels', [])
-                print(f"      Embed Panels: {len(panels)} configured")
+                out(f"      Embed Panels: {len(panels)} configured")
         
-        print("5. Save and activate workspace")
+        out("5. Save and activate workspace")
         
         # Connection test URLs
-        print(f"\n🔗 Direct Access URLs:")
-        print(f"   🖥️  Main API: {base_url}")
-        print(f"   🏥 Health: {base_url}/health")
-        print(f"   🧠 Memory Status: {base_url}/memory/status")
-        print(f"   🔗 Neo4j Browser: http://localhost:7474")
-        print(f"   📊 Metrics: {base_url}/metrics")
-        print(f"   📡 Audit Stream: {base_url}/audit/stream")
+        out(f"\n🔗 Direct Access URLs:")
+        out(f"   🖥️  Main API: {base_url}")
+        out(f"   🏥 Health: {base_url}/health")
+        out(f"   🧠 Memory Status: {base_url}/memory/status")
+        out(f"   🔗 Neo4j Browser: http://localhost:7474")
+        out(f"   📊 Metrics: {base_url}/metrics")
+        out(f"   📡 Audit Stream: {base_url}/audit/stream")
         
         return True
         
     except json.JSONDecodeError as e:
-        print(f"❌ Invalid JSON in config file: {e}")
+        out(f"❌ Invalid JSON in config file: {e}")
         return False
     except Exception as e:
-        print(f"❌ Configuration validation failed: {e}")
+        out(f"❌ Configuration validation failed: {e}")
         return False
 
 def main():
     """Main validation function"""
-    print(f"Validation Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+    lines = [f"Validation Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"]
+    out = lines.append
     
-    success = validate_sigma_config()
+    success = validate_sigma_config(out)
     
     if success:
-        print(f"\n🎯 SIGMA CONFIGURATION READY")
-        print(f"✅ All systems validated and accessible")
-        print(f"🚀 Ready for maximum power operation")
-        return 0
+        out(f"\n🎯 SIGMA CONFIGURATION READY")
+        out(f"✅ All systems validated and accessible")
+        out(f"🚀 Ready for maximum power operation")
     else:
-        print(f"\n⚠️  Configuration issues detected")
-        print(f"📋 Fix issues above and re-run validation")
-        return 1
+        out(f"\n⚠️  Configuration issues detected")
+        out(f"📋 Fix issues above and re-run validation")
+    
+    sys.stdout.write('\n'.join(lines) + '\n')
+    return 0 if success else 1
 
 if __name__ == '__main__':
     exit(main())
@@ -5,14 +5,78 @@ Extracts entities, relations, and metadata from content
 """
 
 import re
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 import hashlib
 
+from services.enrichment.patterns import engines_for, ascii_variants
+
+try:
+    import hyperscan
+except ImportError:  # Optional SIMD prefilter (x86-64 only); every pattern is scanned otherwise
+    hyperscan = None
+
+# Rule-based identifier pre-pass: cheap, precompiled patterns for identifiers
+# that need no context to recognise (the full extractor handles the rest)
+_RULE_PATTERNS = {
+    'email': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b'),
+    'url': re.compile(r'\bhttps?://[^\s<>"\']+'),
+    'uuid': re.compile(r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b'),
+    'date': re.compile(r'\b\d{1,2}/\d{1,2}/\d{4}\b|\b\d{4}-\d{2}-\d{2}\b'),
+    'ip': re.compile(r'\b(?:(?:25[0-5]|2[0-4]\d|1?\d?\d)\.){3}(?:25[0-5]|2[0-4]\d|1?\d?\d)\b'),
+}
+
+def rule_pass(text: str) -> List[Dict]:
+    """Identifiers (emails, URLs, UUIDs, dates, IPs) found by the rule-based pre-pass"""
+    return [
+        {'type': entity_type, 'value': match.group(0), 'start': match.start(), 'end': match.end()}
+        for entity_type, pattern in _RULE_PATTERNS.items()
+        for match in pattern.finditer(text)
+    ]
+
+_NON_TAG_CHARS = re.compile(r'[^\w\s]')
+
+# Name-like entity types, whose punctuation is noise ('Smith, Jr.' is 'Smith Jr');
+# in identifiers and legal terms it tells values apart ($1,000.00 vs $100,000)
+_NAME_TYPES = frozenset({'person', 'attorney', 'court', 'organization', 'address'})
+
+def normalize_entity_value(value: str, entity_type: Optional[str] = None) -> str:
+    """Canonical form used for dedupe keys and tags
+    
+    Names (entity_type None or a name-like type) drop punctuation:
+    'Alice  Smith!' -> 'alice_smith'. Other types keep it and only fold case
+    and whitespace: '$1,000.00' -> '$1,000.00'.
+    """
+    folded = value.casefold()
+    if entity_type is None or entity_type in _NAME_TYPES:
+        folded = _NON_TAG_CHARS.sub('', folded)
+    return '_'.join(folded.split())
+
+# Non-ASCII letters re.IGNORECASE matches against ASCII letters but hyperscan's
+# caseless mode does not; the prefilter sees them as their ASCII letter
+_ASCII_CASE_FOLDS = {0x130: 'i', 0x131: 'i', 0x17F: 's', 0x212A: 'k'}
+
+# Without hyperscan, the broad types whose matches must contain one of these
+# literals (lowercased) are only scanned when the text does
+_REQUIRED_LITERALS = {
+    'organization': ('inc', 'llc', 'corp', 'company', 'foundation', 'trust'),
+    'address': ('st', 'ave', 'road', 'rd', 'dr', 'lane', 'ln', 'court', 'ct'),
+}
+
+# Entity and legal types worth scanning for per content type; any other
+# content type ('text' included) is scanned for every type
+_CONTENT_TYPE_PATTERNS = {
+    'email': ('date', 'money', 'phone', 'email', 'person', 'organization'),
+    'filing': ('case_number', 'court', 'attorney', 'date', 'money',
+               'motion_type', 'deadline', 'statute', 'citation', 'docket_entry'),
+    'docket': ('case_number', 'court', 'attorney', 'date', 'motion_type', 'deadline', 'docket_entry'),
+}
+
 class EntityExtractor:
     def __init__(self):
-        # Entity patterns for legal domain
-        self.entity_patterns = {
+        # Entity patterns for legal domain, compiled once per extractor
+        self.entity_patterns = {name: re.compile(pattern, re.IGNORECASE) for name, pattern in {
             'case_number': r'\b\d+[A-Z]+[- ]?\d+[- ]?\d+\b',  # 1FDV-23-0001009
             'court': r'\b(?:Court|Judge|Hon\.|Justice)\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b',
             'attorney': r'\b(?:Attorney|Counsel|Esq\.|Mr\.|Ms\.)\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', 
@@ -23,75 +87,175 @@ class EntityExtractor:
             'address': r'\b\d+\s+[A-Za-z0-9\s,]+(?:Street|St|Avenue|Ave|Road|Rd|Drive|Dr|Lane|Ln|Court|Ct)\b',
             'person': r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b',  # Simple first/last name
             'organization': r'\b[A-Z][A-Za-z\s&,]+(?:Inc|LLC|Corp|Company|Foundation|Trust)\b'
-        }
+        }.items()}
         
         # Legal-specific patterns
-        self.legal_patterns = {
+        self.legal_patterns = {name: re.compile(pattern, re.IGNORECASE) for name, pattern in {
             'motion_type': r'\b(?:Motion to|Motion for)\s+([A-Za-z\s]+)\b',
             'deadline': r'\b(?:due|deadline|expires?)\s+(?:on\s+)?([\w\s,]+)\b',
             'statute': r'\b(?:§|Section)\s*\d+(?:\.\d+)*\b',
             'citation': r'\b\d+\s+[A-Za-z\.]+\s+\d+\b',  # Legal citations
             'docket_entry': r'\b(?:Doc|Docket)\s*#?\s*\d+\b'
+        }.items()}
+        
+        # (entity patterns, legal patterns) per specialised content type, in
+        # table order; extract falls back to the full tables for other types
+        self._patterns_by_content_type = {
+            content_type: (
+                {name: pattern for name, pattern in self.entity_patterns.items() if name in names},
+                {name: pattern for name, pattern in self.legal_patterns.items() if name in names},
+            )
+            for content_type, names in _CONTENT_TYPE_PATTERNS.items()
+        }
+        
+        self._prefilter = self._build_prefilter()
+        self._scratch = threading.local()  # Hyperscan scratch space is per scanning thread
+        # Plain ASCII text is scanned by RE2 (linear time, where the open-ended
+        # name patterns backtrack quadratically under re) or re in ASCII mode
+        self._ascii = ascii_variants([*self.entity_patterns.values(), *self.legal_patterns.values()])
+    
+    def _build_prefilter(self) -> Optional[tuple]:
+        """Hyperscan database telling which patterns can match, in one pass
+        
+        Compiled in prefilter mode: it may report a pattern re then finds
+        nothing for, but never misses one, so results stay exactly re's.
+        None when hyperscan is unavailable or rejects a pattern.
+        """
+        if hyperscan is None:
+            return None
+        
+        patterns = [*self.entity_patterns.values(), *self.legal_patterns.values()]
+        db = hyperscan.Database()
+        try:
+            db.compile(
+                expressions=[pattern.pattern.encode('utf-8') for pattern in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=(hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+                       | hyperscan.HS_FLAG_PREFILTER | hyperscan.HS_FLAG_SINGLEMATCH)
+            )
+        except hyperscan.error:
+            return None
+        return db, patterns
+    
+    def _matchable(self, content: str) -> Optional[set]:
+        """Patterns that may match content (None: scan with every pattern)"""
+        if self._prefilter is None:
+            return self._literal_matchable(content)
+        try:
+            data = content.translate(_ASCII_CASE_FOLDS).encode('utf-8')
+        except UnicodeEncodeError:  # Lone surrogates are not valid UTF-8 input
+            return None
+        
+        db, patterns = self._prefilter
+        scratch = getattr(self._scratch, 'scratch', None)
+        if scratch is None:
+            scratch = self._scratch.scratch = hyperscan.Scratch(db)
+        found = set()
+        db.scan(data, match_event_handler=lambda pattern_id, *_: found.add(patterns[pattern_id]), scratch=scratch)
+        return found
+    
+    def _literal_matchable(self, content: str) -> set:
+        """Patterns that may match content by the required-literal check alone"""
+        folded = content.translate(_ASCII_CASE_FOLDS).lower()
+        return {
+            pattern
+            for name, pattern in (*self.entity_patterns.items(), *self.legal_patterns.items())
+            if name not in _REQUIRED_LITERALS or any(literal in folded for literal in _REQUIRED_LITERALS[name])
         }
     
     async def extract(self, content: str, content_type: str = 'text') -> Dict[str, List[Dict]]:
-        """Extract entities from content with confidence scores"""
+        """Extract entities from content with confidence scores
+        
+        content_type 'email', 'filing' or 'docket' scans only for the types relevant to it.
+        """
+        return self.extract_sync(content, content_type)
+    
+    def extract_sync(self, content: str, content_type: str = 'text') -> Dict[str, List[Dict]]:
+        """extract as a plain function, for worker threads
+        
+        The work is CPU-bound regex scanning; callers on an event loop can run
+        this in an executor rather than awaiting extract inline.
+        """
         extracted = {
             'entities': [],
             'legal_terms': [],
             'metadata': {
                 'extraction_timestamp': datetime.utcnow().isoformat(),
-                'content_hash': hashlib.md5(content.encode()).hexdigest(),
+                'content_hash': hashlib.blake2b(content.encode(), digest_size=16).hexdigest(),
                 'content_length': len(content)
             }
         }
         
+        # Only the content type's patterns are scanned, minus any the prefilter rules out
+        entity_patterns, legal_patterns = self._patterns_by_content_type.get(
+            content_type, (self.entity_patterns, self.legal_patterns)
+        )
+        matchable = self._matchable(content)
+        engines = engines_for(content, self._ascii)
+        
         # Extract general entities
-        for entity_type, pattern in self.entity_patterns.items():
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            for match in matches:
-                extracted['entities'].append({
-                    'type': entity_type,
-                    'value': match.group(),
-                    'position': [match.start(), match.end()],
-                    'confidence': 0.8,  # Pattern-based confidence
-                    'context': content[max(0, match.start()-50):match.end()+50]
-                })
+        extracted['entities'] = self._deduplicate_entities(
+            content,
+            (
+                (entity_type, match)
+                for entity_type, pattern in entity_patterns.items()
+                if matchable is None or pattern in matchable
+                for match in engines.get(pattern, pattern).finditer(content)
+            ),
+            confidence=0.8,  # Pattern-based confidence
+            context_chars=50
+        )
         
         # Extract legal-specific terms
-        for legal_type, pattern in self.legal_patterns.items():
-            matches = re.finditer(pattern, content, re.IGNORECASE)
-            for match in matches:
-                extracted['legal_terms'].append({
-                    'type': legal_type,
-                    'value': match.group(),
-                    'position': [match.start(), match.end()],
-                    'confidence': 0.9,  # Legal patterns are high confidence
-                    'context': content[max(0, match.start()-30):match.end()+30]
-                })
-        
-        # Deduplicate and score
-        extracted['entities'] = self._deduplicate_entities(extracted['entities'])
-        extracted['legal_terms'] = self._deduplicate_entities(extracted['legal_terms'])
+        extracted['legal_terms'] = self._deduplicate_entities(
+            content,
+            (
+                (legal_type, match)
+                for legal_type, pattern in legal_patterns.items()
+                if matchable is None or pattern in matchable
+                for match in engines.get(pattern, pattern).finditer(content)
+            ),
+            confidence=0.9,  # Legal patterns are high confidence
+            context_chars=30
+        )
         
         # Add trust scoring
         extracted['trust_score'] = self._calculate_trust_score(content, extracted)
         
         return extracted
     
-    def _deduplicate_entities(self, entities: List[Dict]) -> List[Dict]:
-        """Remove duplicate entities and boost confidence"""
+    def _deduplicate_entities(self, content: str, typed_matches: Iterable[Tuple[str, Any]],
+                              confidence: float, context_chars: int) -> List[Dict]:
+        """Entities for (type, match) pairs, deduplicated as they are built
+        
+        Duplicates share a canonical (type, normalized value) key, so case,
+        spacing (and for names, punctuation) variants collapse into one entity tagged
+        entity:<type>:<normalized>. A duplicate only boosts the first entity's
+        confidence; its dict and context slice are never built.
+        """
         entity_map = {}
         
-        for entity in entities:
-            key = f"{entity['type']}:{entity['value'].lower()}"
-            if key in entity_map:
+        for entity_type, match in typed_matches:
+            value = match.group()
+            normalized = normalize_entity_value(value, entity_type)
+            key = (entity_type, normalized)
+            existing = entity_map.get(key)
+            if existing is not None:
                 # Boost confidence for duplicates
-                entity_map[key]['confidence'] = min(1.0, entity_map[key]['confidence'] + 0.1)
-                entity_map[key]['occurrences'] = entity_map[key].get('occurrences', 1) + 1
+                existing['confidence'] = min(1.0, existing['confidence'] + 0.1)
+                existing['occurrences'] += 1
             else:
-                entity['occurrences'] = 1
-                entity_map[key] = entity
+                start, end = match.span()
+                entity_map[key] = {
+                    'type': entity_type,
+                    'value': value,
+                    'position': [start, end],
+                    'confidence': confidence,
+                    'context': content[max(0, start - context_chars):end + context_chars],
+                    'occurrences': 1,
+                    'tag': f"entity:{entity_type}:{normalized}"
+                }
         
         return list(entity_map.values())
     
@@ -115,38 +279,3 @@ class EntityExtractor:
 
 # Initialize extractor
 entity_extractor = EntityExtractor()
-
-async def _process_ingest_item(item: Dict):
-    """Process queued ingestion item"""
-    try:
-        ingest_stats['processing'] += 1
-        start_time = datetime.utcnow()
-        
-        # Extract entities if enrichment enabled
-        if item.get('enrich', True):
-            extraction_result = await entity_extractor.extract(item['content'])
-            item['metadata'] = {**(item.get('metadata', {})), **extraction_result}
-        
-        # Write to memory system
-        from core.memory_orchestrator.aggregator_mcp import MemoryAggregator
-        aggregator = MemoryAggregator()
-        
-        memory_result = await aggregator.write_memory(
-            item['content'],
-            item.get('entity', 'unknown'),
-            item.get('classification', 'general'),
-            item.get('metadata')
-        )
-        
-        # Update stats
-        processing_time = (datetime.utcnow() - start_time).total_seconds()
-        ingest_stats['processing'] -= 1
-        ingest_stats['completed'] += 1
-        ingest_stats['processing_times'].append(processing_time)
-        
-        print(f"✅ Processed ingestion: {item.get('entity')} in {processing_time:.2f}s")
-        
-    except Exception as e:
-        ingest_stats['processing'] -= 1
-        ingest_stats['failed'] += 1
-        print(f"❌ Ingestion failed: {e}")
\ No newline at end of file
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Pattern Engines
+ASCII-only variants of the enrichment regexes: RE2 (linear-time, no
+backtracking) when installed, stdlib re in ASCII mode otherwise
+"""
+
+import re
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    import re2
+except ImportError:  # Optional linear-time engine (google-re2); stdlib re otherwise
+    re2 = None
+
+# Text where the variants can disagree with re: their \s, \w, \d and \b are
+# ASCII-only, and \s leaves out \x1c-\x1f (RE2's also \v), which re counts as
+# whitespace
+_RE_ONLY_CHARS = re.compile(r'[^\x00-\x0a\x0c\x0d\x20-\x7f]')
+
+# An unescaped $ (RE2's matches at end of text only; re's also matches before
+# a trailing newline)
+_END_ANCHOR = re.compile(r'(?<!\\)(?:\\\\)*\$')
+
+def linear_variant(pattern: re.Pattern) -> Optional[Any]:
+    """RE2 compile of a case-insensitive re pattern (None where it could match differently)"""
+    if re2 is None or _END_ANCHOR.search(pattern.pattern):
+        return None
+    try:
+        return re2.compile(f'(?i){pattern.pattern}')
+    except re2.error:  # Lookarounds, backreferences
+        return None
+
+def ascii_variant(pattern: re.Pattern) -> Any:
+    """Variant of a re pattern for plain ASCII text: RE2 where it can take it
+    
+    Otherwise the pattern recompiled with re.ASCII, which skips sre's Unicode
+    character tables (about twice as fast) and matches the same on such text.
+    """
+    linear = linear_variant(pattern)
+    return linear if linear is not None else re.compile(pattern.pattern, pattern.flags & ~re.UNICODE | re.ASCII)
+
+def ascii_variants(patterns: Iterable[re.Pattern]) -> Dict[re.Pattern, Any]:
+    """ASCII variants keyed by their re pattern"""
+    return {pattern: ascii_variant(pattern) for pattern in patterns}
+
+def engines_for(text: str, variants: Dict[re.Pattern, Any]) -> Dict[re.Pattern, Any]:
+    """The variants usable on text: all of them for plain ASCII, none otherwise
+
+    Look patterns up with engines.get(pattern, pattern) so each scan falls back
+    to stdlib re where no variant applies.
+    """
+    return variants if _RE_ONLY_CHARS.search(text) is None else {}
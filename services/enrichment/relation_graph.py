@@ -4,143 +4,197 @@ Relation Graph Builder
 Builds entity relationships and updates memory graph
 """
 
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+import functools
+import hashlib
+import itertools
 import re
 from datetime import datetime
 
+from services.enrichment.patterns import engines_for, ascii_variants
+
+def _compile_pattern_lists(patterns: Dict[str, List[str]]) -> Dict[str, List[re.Pattern]]:
+    """Compile each pattern list once (case-insensitive)"""
+    return {name: [re.compile(pattern, re.IGNORECASE) for pattern in pattern_list]
+            for name, pattern_list in patterns.items()}
+
+@functools.lru_cache(maxsize=None)
+def _relation_batch_query(label: str) -> str:
+    """UNWIND statement creating a batch of relations of one type (text reused per type)"""
+    return f"""
+    UNWIND $rows AS row
+    MERGE (s:Entity {{name: row.source, type: row.source_type}})
+    MERGE (t:Entity {{name: row.target, type: row.target_type}})
+    CREATE (s)-[r:{label} {{
+        confidence: row.confidence,
+        context: row.context,
+        created_at: datetime(),
+        extraction_id: row.extraction_id
+    }}]->(t)
+    RETURN count(r) AS created
+    """
+
 class RelationGraphBuilder:
     def __init__(self):
-        # Relationship patterns for legal domain
-        self.relation_patterns = {
-            'represents': [r'(\w+(?:\s+\w+)*?)\s+represents\s+(\w+(?:\s+\w+)*?)', r'attorney for (\w+(?:\s+\w+)*?)'],
-            'vs': [r'(\w+(?:\s+\w+)*?)\s+v\.?\s+(\w+(?:\s+\w+)*?)', r'(\w+(?:\s+\w+)*?)\s+versus\s+(\w+(?:\s+\w+)*?)'],
-            'filed_by': [r'filed by (\w+(?:\s+\w+)*?)'],
-            'assigned_to': [r'assigned to (\w+(?:\s+\w+)*?)', r'Hon\. (\w+(?:\s+\w+)*?)'],
-            'related_to': [r'related to (\w+(?:\s+\w+)*?)', r'in connection with (\w+(?:\s+\w+)*?)'],
-            'deadline': [r'(\w+(?:\s+\w+)*?)\s+(?:due|expires?)\s+(.+?)(?:[,.]|$)'],
-            'owns': [r'(\w+(?:\s+\w+)*?)\s+owns\s+(\w+(?:\s+\w+)*?)'],
-            'works_for': [r'(\w+(?:\s+\w+)*?)\s+(?:works for|employed by)\s+(\w+(?:\s+\w+)*?)'],
-            'located_at': [r'(\w+(?:\s+\w+)*?)\s+(?:at|located at)\s+(.+?)(?:[,.]|$)']
-        }
+        # Relationship patterns for legal domain, compiled once per builder.
+        # Leading names start on a word boundary and are capped at five words,
+        # free-text targets at 200 characters (taken possessively), so no scan
+        # backtracks over the whole text.
+        self.relation_patterns = _compile_pattern_lists({
+            'represents': [
+                r'\b(\w+(?:\s+\w+){0,4}?)\s+represents\s+(\w+(?:\s+\w+){0,4}?)',
+                r'attorney for (\w+(?:\s+\w+){0,4}?)'
+            ],
+            'vs': [
+                r'\b(\w+(?:\s+\w+){0,4}?)\s+v\.?\s+(\w+(?:\s+\w+){0,4}?)',
+                r'\b(\w+(?:\s+\w+){0,4}?)\s+versus\s+(\w+(?:\s+\w+){0,4}?)'
+            ],
+            'filed_by': [r'filed by (\w+(?:\s+\w+){0,4}?)'],
+            'assigned_to': [r'assigned to (\w+(?:\s+\w+){0,4}?)', r'Hon\. (\w+(?:\s+\w+){0,4}?)'],
+            'related_to': [r'related to (\w+(?:\s+\w+){0,4}?)', r'in connection with (\w+(?:\s+\w+){0,4}?)'],
+            'deadline': [r'\b(\w+(?:\s+\w+){0,4}?)\s+(?:due|expires?)\s+([^,.\n]{1,200}+)(?:[,.]|$)'],
+            'owns': [r'\b(\w+(?:\s+\w+){0,4}?)\s+owns\s+(\w+(?:\s+\w+){0,4}?)'],
+            'works_for': [r'\b(\w+(?:\s+\w+){0,4}?)\s+(?:works for|employed by)\s+(\w+(?:\s+\w+){0,4}?)'],
+            'located_at': [r'\b(\w+(?:\s+\w+){0,4}?)\s+(?:at|located at)\s+([^,.\n]{1,200}+)(?:[,.]|$)']
+        })
         
-        # Entity type inference
-        self.entity_type_hints = {
-            'person': [r'\b(?:Mr|Ms|Dr|Hon|Justice|Judge|Attorney|Counsel)\.?\s+\w+'],
-            'organization': [r'\b\w+(?:\s+\w+)*\s+(?:Inc|LLC|Corp|Company|Foundation|Trust)\b'],
-            'court': [r'\b(?:Court|Tribunal|Commission)\s+\w+'],
-            'case': [r'\b\d+[A-Z]+[- ]?\d+[- ]?\d+\b'],
-            'document': [r'\b(?:Motion|Order|Brief|Complaint|Answer|Reply)\b']
-        }
+        # Entity type inference: group 1 is the entity name (capitalized words
+        # for people and organizations, whatever the case of the title/suffix)
+        self.entity_type_hints = _compile_pattern_lists({
+            'person': [
+                r'\b(?:Mr|Ms|Dr|Hon|Justice|Judge|Attorney|Counsel)\.?\s+((?-i:[A-Z]\w*)(?:\s+(?-i:[A-Z]\w*))*)'
+            ],
+            'organization': [r'\b((?-i:[A-Z]\w*)(?:\s+(?-i:[A-Z]\w*))*\s+(?:Inc|LLC|Corp|Company|Foundation|Trust))\b'],
+            'court': [r'\b((?:Court|Tribunal|Commission)\s+\w+)'],
+            'case': [r'\b(\d+[A-Z]+[- ]?\d+[- ]?\d+)\b'],
+            'document': [r'\b(Motion|Order|Brief|Complaint|Answer|Reply)\b']
+        })
+        
+        # Temporal indicators
+        self.temporal_patterns = _compile_pattern_lists({
+            'before': [r'before\s+(\w+(?:\s+\w+){0,4}?)', r'prior to\s+(\w+(?:\s+\w+){0,4}?)'],
+            'after': [r'after\s+(\w+(?:\s+\w+){0,4}?)', r'following\s+(\w+(?:\s+\w+){0,4}?)'],
+            'during': [r'during\s+(\w+(?:\s+\w+){0,4}?)', r'while\s+(\w+(?:\s+\w+){0,4}?)']
+        })
+        
+        # Variants for plain ASCII text (RE2, or re in ASCII mode for patterns
+        # anchored on $ and when RE2 is not installed)
+        self._ascii = ascii_variants(
+            pattern
+            for table in (self.relation_patterns, self.entity_type_hints, self.temporal_patterns)
+            for pattern_list in table.values()
+            for pattern in pattern_list
+        )
     
     async def build_relations(self, content: str, extracted_entities: List[Dict]) -> List[Dict]:
         """Build relationship graph from content and entities"""
-        relations = []
+        return self.build_relations_sync(content, extracted_entities)
+    
+    def build_relations_sync(self, content: str, extracted_entities: List[Dict]) -> List[Dict]:
+        """build_relations as a plain function, for worker threads"""
+        extracted_at = datetime.utcnow().isoformat()  # One timestamp for the whole document
+        
+        # Names are typed up front so relations stream straight into dedupe
+        # without an intermediate list
+        entity_types = self._infer_entity_types(content)
+        
+        return self._deduplicate_relations(itertools.chain(
+            self._pattern_relations(content, entity_types, extracted_at),
+            self._extract_temporal_relations(content, extracted_entities, extracted_at)
+        ))
+    
+    def _pattern_relations(self, content: str, entity_types: Dict[str, str], extracted_at: str) -> Iterator[Dict]:
+        """Relations matched by relation_patterns, typed from entity_types (case-folded names)"""
+        engines = engines_for(content, self._ascii)
         
-        # Extract relationships using patterns
         for relation_type, patterns in self.relation_patterns.items():
             for pattern in patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
+                matches = engines.get(pattern, pattern).finditer(content)
                 for match in matches:
                     groups = match.groups()
                     if len(groups) >= 2:
                         source_entity = groups[0].strip()
                         target_entity = groups[1].strip()
                         
-                        relations.append({
+                        yield {
                             'type': relation_type,
                             'source': source_entity,
                             'target': target_entity,
                             'confidence': 0.7,
                             'context': match.group(),
                             'position': [match.start(), match.end()],
-                            'extracted_at': datetime.utcnow().isoformat()
-                        })
-        
-        # Infer entity types
-        entity_types = self._infer_entity_types(content)
-        
-        # Add entity type information to relations
-        for relation in relations:
-            relation['source_type'] = entity_types.get(relation['source'], 'unknown')
-            relation['target_type'] = entity_types.get(relation['target'], 'unknown')
-        
-        # Add temporal relationships
-        temporal_relations = self._extract_temporal_relations(content, extracted_entities)
-        relations.extend(temporal_relations)
-        
-        return self._deduplicate_relations(relations)
+                            'extracted_at': extracted_at,
+                            'source_type': entity_types.get(source_entity.casefold(), 'unknown'),
+                            'target_type': entity_types.get(target_entity.casefold(), 'unknown')
+                        }
     
     def _infer_entity_types(self, content: str) -> Dict[str, str]:
-        """Infer entity types from content patterns"""
+        """Infer entity types from content patterns, keyed by case-folded entity name"""
         entity_types = {}
+        engines = engines_for(content, self._ascii)
         
         for entity_type, patterns in self.entity_type_hints.items():
             for pattern in patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
+                matches = engines.get(pattern, pattern).finditer(content)
                 for match in matches:
-                    # Extract the actual entity name (usually the last capitalized word)
-                    words = match.group().split()
-                    if words:
-                        entity_name = ' '.join([w for w in words if w[0].isupper() and not w.endswith('.')])
-                        if entity_name:
-                            entity_types[entity_name] = entity_type
+                    entity_types[match.group(1).casefold()] = entity_type
         
         return entity_types
     
-    def _extract_temporal_relations(self, content: str, entities: List[Dict]) -> List[Dict]:
+    def _extract_temporal_relations(self, content: str, entities: List[Dict],
+                                    extracted_at: str = None) -> Iterator[Dict]:
         """Extract temporal relationships (before, after, during)"""
-        temporal_relations = []
+        extracted_at = extracted_at or datetime.utcnow().isoformat()
+        engines = engines_for(content, self._ascii)
         
-        # Find temporal indicators
-        temporal_patterns = {
-            'before': [r'before\s+(\w+(?:\s+\w+)*?)', r'prior to\s+(\w+(?:\s+\w+)*?)'],
-            'after': [r'after\s+(\w+(?:\s+\w+)*?)', r'following\s+(\w+(?:\s+\w+)*?)'],
-            'during': [r'during\s+(\w+(?:\s+\w+)*?)', r'while\s+(\w+(?:\s+\w+)*?)']
-        }
+        # Entities sorted by their extracted position so a temporal match finds
+        # its neighbours by bisection (searched for only when none was recorded)
+        located = sorted(
+            (entity['position'][0] if entity.get('position') else content.find(value), index, value)
+            for index, entity in enumerate(entities)
+            if (value := entity.get('value', ''))
+        )
+        starts = [position for position, _, _ in located]
         
-        for relation_type, patterns in temporal_patterns.items():
+        for relation_type, patterns in self.temporal_patterns.items():
             for pattern in patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
+                matches = engines.get(pattern, pattern).finditer(content)
                 for match in matches:
                     temporal_entity = match.group(1).strip()
+                    match_pos = match.start()
                     
-                    # Find nearby entities to create relationships
-                    for entity in entities:
-                        entity_value = entity.get('value', '')
-                        if entity_value and entity_value != temporal_entity:
-                            # Check if entities are close in the text
-                            entity_pos = content.find(entity_value)
-                            match_pos = match.start()
-                            
-                            if abs(entity_pos - match_pos) < 100:  # Within 100 characters
-                                temporal_relations.append({
-                                    'type': f'temporal_{relation_type}',
-                                    'source': entity_value,
-                                    'target': temporal_entity,
-                                    'confidence': 0.6,
-                                    'context': match.group(),
-                                    'extracted_at': datetime.utcnow().isoformat()
-                                })
-        
-        return temporal_relations
+                    # Entities within 100 characters, in their original order
+                    nearby = located[bisect_right(starts, match_pos - 100):bisect_left(starts, match_pos + 100)]
+                    for _, _, entity_value in sorted(nearby, key=itemgetter(1)):
+                        if entity_value != temporal_entity:
+                            yield {
+                                'type': f'temporal_{relation_type}',
+                                'source': entity_value,
+                                'target': temporal_entity,
+                                'confidence': 0.6,
+                                'context': match.group(),
+                                'extracted_at': extracted_at
+                            }
     
-    def _deduplicate_relations(self, relations: List[Dict]) -> List[Dict]:
-        """Remove duplicate relations and boost confidence"""
+    def _deduplicate_relations(self, relations: Iterable[Dict]) -> List[Dict]:
+        """Remove duplicate relations and boost confidence, folding them in as they stream"""
         relation_map = {}
         
         for relation in relations:
-            # Create unique key for relation
-            key = f"{relation['type']}:{relation['source']}:{relation['target']}"
-            key_hash = hashlib.md5(key.encode()).hexdigest()[:8]
+            # Duplicates share (type, source, target); only a new relation's id is hashed
+            key = (relation['type'], relation['source'], relation['target'])
+            existing = relation_map.get(key)
             
-            if key_hash in relation_map:
+            if existing is not None:
                 # Boost confidence for duplicates
-                relation_map[key_hash]['confidence'] = min(1.0, relation_map[key_hash]['confidence'] + 0.1)
-                relation_map[key_hash]['occurrences'] = relation_map[key_hash].get('occurrences', 1) + 1
+                existing['confidence'] = min(1.0, existing['confidence'] + 0.1)
+                existing['occurrences'] = existing.get('occurrences', 1) + 1
             else:
                 relation['occurrences'] = 1
-                relation['id'] = key_hash
-                relation_map[key_hash] = relation
+                relation['id'] = hashlib.blake2b(':'.join(key).encode(), digest_size=4).hexdigest()
+                relation_map[key] = relation
         
         return list(relation_map.values())
     
@@ -149,40 +203,35 @@ class RelationGraphBuilder:
         if not neo4j_client or not relations:
             return {'created': 0, 'errors': []}
         
+        # Relationship types can't be parameters, so relations go out as one
+        # UNWIND statement per type rather than one round trip each
+        rows_by_label = {}
+        for relation in relations:
+            rows_by_label.setdefault(relation['type'].upper().replace(' ', '_'), []).append({
+                'source': relation['source'],
+                'target': relation['target'],
+                'source_type': relation.get('source_type', 'unknown'),
+                'target_type': relation.get('target_type', 'unknown'),
+                'confidence': relation['confidence'],
+                'context': relation.get('context', ''),
+                'extraction_id': relation.get('id', '')
+            })
+        
         created_count = 0
         errors = []
         
-        for relation in relations:
+        # Types run one after another: concurrent MERGEs on shared Entity
+        # nodes would contend for the same locks
+        for label, rows in rows_by_label.items():
             try:
-                # Create Cypher query for relationship
-                cypher = f"""
-                MERGE (s:Entity {{name: $source, type: $source_type}})
-                MERGE (t:Entity {{name: $target, type: $target_type}})
-                CREATE (s)-[r:{relation['type'].upper().replace(' ', '_')} {{
-                    confidence: $confidence,
-                    context: $context,
-                    created_at: datetime(),
-                    extraction_id: $extraction_id
-                }}]->(t)
-                RETURN r
-                """
-                
-                params = {
-                    'source': relation['source'],
-                    'target': relation['target'],
-                    'source_type': relation.get('source_type', 'unknown'),
-                    'target_type': relation.get('target_type', 'unknown'),
-                    'confidence': relation['confidence'],
-                    'context': relation.get('context', ''),
-                    'extraction_id': relation.get('id', '')
-                }
-                
-                result = await neo4j_client.cypher(cypher, params)
-                if result.get('records'):
-                    created_count += 1
+                result = await neo4j_client.cypher(_relation_batch_query(label), {'rows': rows})
+                if 'error' in result:
+                    errors.append(f"Relation {label}: {result['error']}")
+                else:
+                    created_count += sum(record['created'] for record in result.get('records', []))
                 
             except Exception as e:
-                errors.append(f"Relation {relation['type']}: {str(e)}")
+                errors.append(f"Relation {label}: {str(e)}")
         
         return {
             'created': created_count,
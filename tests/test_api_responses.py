@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+API Response Tests
+JSON encoding with and without orjson
+"""
+
+import json
+import pytest
+
+PAYLOAD = {'score': float('nan'), 'bounds': [float('inf'), -float('inf'), 1.5], 'pair': (0.25, float('nan'))}
+EXPECTED = {'score': None, 'bounds': [None, None, 1.5], 'pair': [0.25, None]}
+
+class TestDumps:
+
+    @pytest.fixture
+    def responses(self):
+        pytest.importorskip('fastapi')
+        from api import responses
+        return responses
+
+    def test_orjson_writes_non_finite_as_null(self, responses):
+        """orjson encodes NaN/Infinity as null"""
+        if responses.orjson is None:
+            pytest.skip("orjson not installed")
+
+        assert json.loads(responses.dumps(PAYLOAD)) == EXPECTED
+
+        print("✅ orjson non-finite test passed")
+
+    def test_stdlib_fallback_matches_orjson(self, responses, monkeypatch):
+        """The stdlib fallback encodes NaN/Infinity as null instead of raising"""
+        monkeypatch.setattr(responses, 'orjson', None)
+
+        assert json.loads(responses.dumps(PAYLOAD)) == EXPECTED
+        assert responses.dumps({'name': 'José', 'n': 1}) == '{"name":"José","n":1}'.encode('utf-8')
+
+        print("✅ Stdlib fallback non-finite test passed")
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])
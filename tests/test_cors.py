@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+CORS Middleware Tests
+Preflight answers from the static allow-all middleware
+"""
+
+import asyncio
+import pytest
+
+from api.middleware.cors import StaticCORSMiddleware
+
+def _call(middleware, method, headers):
+    """Run one request through the middleware and return (status, response headers)"""
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': '/memory/search', 'headers': headers}
+    asyncio.run(middleware(scope, receive, send))
+    start = sent[0]
+    return start['status'], dict(start['headers'])
+
+class TestStaticCORS:
+
+    @pytest.fixture
+    def middleware(self):
+        async def app(scope, receive, send):
+            await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b'{}'})
+        return StaticCORSMiddleware(app)
+
+    def test_preflight_echoes_requested_headers(self, middleware):
+        """A preflight asking for Authorization is allowed it explicitly"""
+        status, headers = _call(middleware, 'OPTIONS', [
+            (b'origin', b'https://sigma.example'),
+            (b'access-control-request-method', b'POST'),
+            (b'access-control-request-headers', b'authorization'),
+        ])
+
+        assert status == 204
+        assert headers[b'access-control-allow-headers'] == b'authorization'
+        assert headers[b'access-control-allow-origin'] == b'*'
+
+        print("✅ Preflight header echo test passed")
+
+    def test_simple_request_reaches_app(self, middleware):
+        """Non-preflight requests go to the app with the origin header appended"""
+        status, headers = _call(middleware, 'OPTIONS', [(b'origin', b'https://sigma.example')])
+
+        assert status == 200
+        assert headers[b'access-control-allow-origin'] == b'*'
+
+        print("✅ Pass-through test passed")
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v'])